@@ -0,0 +1,177 @@
+"""
+Renders many figures from one process.
+
+The job file is a json list where each job holds the mkplot.py arguments of one
+figure, either as a command line string or as a list of arguments:
+
+    [
+        "--legend prog_alias -t 1000 --save-to cactus examples/solver1.json examples/solver2.json",
+        ["-p", "scatter", "--save-to", "scatter", "examples/solver1.json", "examples/solver2.json"]
+    ]
+
+Every distinct input is loaded once and the Program objects are shared by all jobs.
+"""
+import argparse
+import json
+import multiprocessing
+import shlex
+import time
+import traceback
+
+from load_data import load_data
+
+# Programs shared with the render workers, set by _init_worker
+_programs = None
+
+
+def load_jobs(job_file):
+    with open(job_file, "r") as f:
+        jobs = json.load(f)
+
+    from mkplot import get_parser
+
+    parser = get_parser()
+    return [vars(parser.parse_args(shlex.split(job) if isinstance(job, str) else job)) for job in jobs]
+
+
+def _load_key(args):
+    # The options that change what load_data returns
+    return (
+        args["data_type"],
+        args["stat_type"],
+        args["timeout"],
+        args["plot_type"],
+        args["x_min"],
+        args["y_min"],
+        args["dataset"],
+        args["db_data_ltb"],
+    )
+
+
+def load_shared_data(jobs):
+    """
+    Loads every distinct input of the jobs once. Returns the {key: Program} map, the list of
+    program keys of each job and the load timings. Json files are shared per file so jobs
+    over overlapping solver sets reuse them, csv files and db specs per input.
+    """
+    programs, timings = {}, []
+    job_keys = []
+    for args in jobs:
+        load_key = _load_key(args)
+        if args["data_type"] == "json":
+            inputs = [(load_key, path) for path in args["data"]]
+        else:
+            inputs = [(load_key, tuple(args["data"]))]
+
+        missing = [key for key in dict.fromkeys(inputs) if key not in programs]
+        if missing:
+            start = time.perf_counter()
+            if args["data_type"] == "json":
+                for key, data in zip(missing, load_data([key[1] for key in missing], args)):
+                    programs[key] = [data]
+            else:
+                programs[missing[0]] = load_data(args["data"], args)
+            seconds = time.perf_counter() - start
+            timings.append({"inputs": [str(key[1]) for key in missing], "seconds": seconds})
+
+        job_keys.append(inputs)
+
+    return programs, job_keys, timings
+
+
+def _init_worker(programs):
+    global _programs
+    _programs = programs
+
+    # Set up the plotting stack once per worker
+    import matplotlib
+
+    matplotlib.use("pdf")  # for not loading GUI modules
+    import cactus  # noqa: F401
+    import scatter  # noqa: F401
+
+
+def _render_job(job):
+    from mkplot import plot_data, print_stats, process_data
+
+    index, args, keys = job
+    data = [prog for key in keys for prog in _programs[key]]
+
+    start = time.perf_counter()
+    try:
+        programs, data = data, process_data(data, args)
+        # The plotters scope their rc settings and own their figures, so nothing leaks into the next job
+        if args["dry_run"]:
+            print_stats(data, args, programs)
+        else:
+            plot_data(data, args)
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+
+    return {"job": index, "save_to": args["save_to"], "seconds": time.perf_counter() - start, "error": error}
+
+
+def run_batch(jobs, processes=1):
+    """
+    Loads the inputs of all jobs once and renders the jobs, in a process pool if processes > 1.
+    Returns the timing report.
+    """
+    start = time.perf_counter()
+    programs, job_keys, load_timings = load_shared_data(jobs)
+    load_seconds = time.perf_counter() - start
+
+    tasks = [(i, args, keys) for i, (args, keys) in enumerate(zip(jobs, job_keys))]
+    if processes > 1:
+        with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(programs,)) as pool:
+            results = pool.map(_render_job, tasks, chunksize=1)
+    else:
+        _init_worker(programs)
+        results = [_render_job(task) for task in tasks]
+
+    return {
+        "load_seconds": load_seconds,
+        "loads": load_timings,
+        "jobs": results,
+        "total_seconds": time.perf_counter() - start,
+    }
+
+
+def print_report(report):
+    print()
+    print(f"# Loading: {report['load_seconds']:8.2f} s ({len(report['loads'])} loads)")
+    for res in report["jobs"]:
+        status = "FAILED" if res["error"] else "ok"
+        print(f"# Job {res['job']:>4}: {res['seconds']:8.2f} s  {status:>6}  {res['save_to']}")
+    print(f"# Total:   {report['total_seconds']:8.2f} s")
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Render the figures of a job file of mkplot.py arguments",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("job_file", help="Json list of mkplot.py argument strings or lists")
+    parser.add_argument("-j", "--processes", type=int, default=1, help="Number of render processes")
+    parser.add_argument("--report", default=None, help="Write the json timing report to this file")
+    return parser
+
+
+def main():
+    args = vars(get_parser().parse_args())
+
+    report = run_batch(load_jobs(args["job_file"]), args["processes"])
+    print_report(report)
+    if args["report"]:
+        with open(args["report"], "w") as f:
+            json.dump(report, f, indent=4)
+
+    failed = [res for res in report["jobs"] if res["error"]]
+    for res in failed:
+        print(f"\n# Job {res['job']} failed:\n{res['error']}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
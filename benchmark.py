@@ -0,0 +1,672 @@
+"""
+Benchmarks for the data loading and plotting pipeline on synthetic solver results.
+
+Every measurement runs in a fresh process so that the reported peak memory
+(max. resident set size) belongs to that measurement alone.
+
+Example:
+    python3 benchmark.py json_load --instances 5000000 --extra_fields 8
+
+The pipeline benchmark times whole mkplot.py runs and writes a json report, and
+two reports can be compared to catch performance regressions:
+
+    python3 benchmark.py pipeline --instances 100000 1000000 --out before.json
+    python3 benchmark.py pipeline --instances 100000 1000000 --out after.json
+    python3 benchmark.py compare before.json after.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import random
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+from profiling import peak_rss_mb
+
+
+RUNTIME_DISTRIBUTIONS = ("exp", "uniform", "lognormal")
+
+
+def _sample_runtime(rng, distribution, timeout):
+    if distribution == "exp":
+        return rng.expovariate(10.0 / timeout)
+    elif distribution == "uniform":
+        return rng.uniform(0, timeout)
+    elif distribution == "lognormal":
+        # Most instances are easy, with a long tail towards the timeout
+        return min(rng.lognormvariate(math.log(timeout / 20), 1.5), timeout)
+    raise ValueError(f"Unknown runtime distribution \"{distribution}\"")
+
+
+def generate_json_results(
+    file_path,
+    nof_instances,
+    solved_ratio=0.7,
+    timeout=1000.0,
+    extra_fields=1,
+    seed=0,
+    program="synthetic",
+    distribution="exp",
+):
+    """
+    Writes a synthetic result file in the mkplot json format, one entry at a time.
+    The file size grows with the number of instances and extra fields per instance.
+    """
+    rng = random.Random(seed)
+    with open(file_path, "w") as f:
+        f.write('{\n    "stats": {')
+        for i in range(nof_instances):
+            solved = rng.random() < solved_ratio
+            entry = {
+                "status": solved,
+                "rtime": round(_sample_runtime(rng, distribution, timeout), 4) if solved else timeout,
+                "mempeak": f"{rng.randrange(1 << 12, 1 << 20)} KiB",
+            }
+            for k in range(extra_fields - 1):
+                entry[f"extra_{k}"] = rng.random()
+            f.write(("," if i else "") + f'\n        "instance{i}": ' + json.dumps(entry))
+        f.write('\n    },\n    "preamble": ')
+        f.write(json.dumps({"program": program, "prog_alias": program}))
+        f.write("\n}\n")
+
+
+def generate_result_set(
+    out_dir,
+    nof_solvers,
+    nof_instances,
+    solved_ratio=0.7,
+    timeout=1000.0,
+    extra_fields=1,
+    distribution="exp",
+    seed=0,
+):
+    """
+    Writes one result file per solver over the same instances and returns their paths.
+    The files only depend on the arguments, so the same seed gives the same result set.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for k in range(nof_solvers):
+        file_path = os.path.join(out_dir, f"solver{k}.json")
+        generate_json_results(
+            file_path,
+            nof_instances,
+            solved_ratio,
+            timeout,
+            extra_fields,
+            seed + k,
+            program=f"solver{k}",
+            distribution=distribution,
+        )
+        paths.append(file_path)
+    return paths
+
+
+def _current_rss_mb() -> float:
+    # Current (not peak) resident set size on Linux, the peak elsewhere
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def _measure(func, *args, **kwargs):
+    start = time.perf_counter()
+    res = func(*args, **kwargs)
+    return time.perf_counter() - start, peak_rss_mb(), res
+
+
+def _run_isolated(func, *args, **kwargs):
+    """
+    Runs the measurement in a fresh process and returns (seconds, peak rss MB, result).
+    """
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1, maxtasksperchild=1) as pool:
+        return pool.apply(_measure, (func, *args), kwargs)
+
+
+def _json_load_task(file_path, stream):
+    from load_data import load_json_data_from_file
+
+    return len(load_json_data_from_file(file_path, "rtime", float("inf"), 0, None, stream=stream))
+
+
+def bench_json_load(args):
+    with tempfile.TemporaryDirectory(dir=args["tmp_dir"]) as tmp_dir:
+        file_path = os.path.join(tmp_dir, "results.json")
+        print(f"# Generating {args['instances']} instances ...")
+        generate_json_results(file_path, args["instances"], extra_fields=args["extra_fields"])
+        print(f"# File size: {os.path.getsize(file_path) / (1024 * 1024):.1f} MB")
+
+        for label, stream in (("json.load", False), ("stream", True)):
+            sec, rss, solved = _run_isolated(_json_load_task, file_path, stream)
+            print(f"{label:>12}: {sec:8.2f} s  peak rss {rss:9.1f} MB  solved {solved}")
+
+
+def _synthetic_programs(nof_instances, nof_programs=2, solved_ratio=0.7, seed=0):
+    import numpy as np
+    from load_data import Program
+
+    rng = np.random.default_rng(seed)
+    programs = []
+    for p in range(nof_programs):
+        solved = np.flatnonzero(rng.random(nof_instances) < solved_ratio)
+        rng.shuffle(solved)
+        names = np.array([f"instance{i}" for i in solved], dtype=object)
+        values = rng.exponential(100.0, len(solved))
+        programs.append(Program.from_arrays(f"prog{p}", f"prog{p}", names, values))
+    return programs
+
+
+def _join_data_sets(data):
+    # The former set/dict based join, kept as the baseline
+    from load_data import Program
+
+    inter = set(data[0].get_instance_names())
+    for prog in data[1:]:
+        inter = inter.intersection(prog.get_instance_names())
+    new_data = []
+    for prog in data:
+        curr_inst = dict(zip(prog.get_instance_names().tolist(), prog.get_values().tolist()))
+        new_data += [Program(prog.get_name(), prog.get_alias(), {inst: curr_inst[inst] for inst in inter})]
+    return new_data
+
+
+def bench_join(args):
+    from load_data import join_data
+
+    for nof_instances in args["instances"]:
+        programs = _synthetic_programs(nof_instances, args["programs"])
+        for label, func in (("set/dict", _join_data_sets), ("sorted-index", join_data)):
+            start = time.perf_counter()
+            joined = func(programs)
+            sec = time.perf_counter() - start
+            print(f"{nof_instances:>9} instances {label:>13}: {sec:8.3f} s  joined {len(joined[0])}")
+
+
+def generate_sqlite_db(db_path, nof_problems, nof_experiments, solved_ratio=0.7, seed=0):
+    """
+    Writes a SQLite database with the ProblemRun/ProblemVersion/SZSStatus/Problem schema
+    of the iProver DB, usable as a local stand-in through DB(connect=..., placeholder="?").
+    """
+    import sqlite3
+    from database import LIBRARY_VERSION
+
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        """
+        CREATE TABLE Problem (ProblemID INTEGER PRIMARY KEY, ProblemName VARCHAR(255));
+        CREATE TABLE ProblemVersion (
+            ProblemVersionID INTEGER PRIMARY KEY, Problem INT, Version INT, Status INT
+        );
+        CREATE TABLE SZSStatus (SZSStatusID INTEGER PRIMARY KEY, Solved INT, Sat INT, Unsat INT);
+        CREATE TABLE ProblemRun (
+            Experiment INT, Problem INT, Runtime REAL, Status INT, SZS_Status VARCHAR(32)
+        );
+        CREATE INDEX ProblemRunExperiment ON ProblemRun (Experiment);
+        CREATE INDEX ProblemName ON Problem (ProblemName);
+        INSERT INTO SZSStatus VALUES (1, 1, 0, 1), (2, 1, 1, 0), (3, 0, 0, 0);
+        """
+    )
+    conn.executemany("INSERT INTO Problem VALUES (?, ?)", ((i, f"PROB{i:07d}") for i in range(nof_problems)))
+    conn.executemany(
+        "INSERT INTO ProblemVersion VALUES (?, ?, ?, ?)",
+        ((i, i, LIBRARY_VERSION, 1) for i in range(nof_problems)),
+    )
+    runs = (
+        (exp_id, i, rng.expovariate(0.01), 1 if rng.random() < solved_ratio else 3, "Theorem")
+        for exp_id in range(1, nof_experiments + 1)
+        for i in range(nof_problems)
+    )
+    conn.executemany("INSERT INTO ProblemRun VALUES (?, ?, ?, ?, ?)", runs)
+    conn.commit()
+    conn.close()
+
+
+def bench_db_problem_set(args):
+    import functools
+    import sqlite3
+    from database import DB
+
+    with tempfile.TemporaryDirectory(dir=args["tmp_dir"]) as tmp_dir:
+        db_path = os.path.join(tmp_dir, "results.db")
+        generate_sqlite_db(db_path, args["problems"], args["experiments"])
+        connect = functools.partial(sqlite3.connect, db_path)
+        exp_ids = list(range(1, args["experiments"] + 1))
+
+        for subset_size in args["subset_sizes"]:
+            subset = random.Random(0).sample(range(args["problems"]), subset_size)
+            problem_set = [f"PROB{i:07d}" for i in subset]
+            for label, use_table in (("inline IN", False), ("temp table", True)):
+                with DB(connect=connect, placeholder="?", problem_set_table=use_table) as db:
+                    start = time.perf_counter()
+                    rows = sum(len(db.get_solved_problem_name_time(e, 10000, problem_set)) for e in exp_ids)
+                    sec = time.perf_counter() - start
+                print(f"{subset_size:>7} problems {label:>10}: {sec:8.3f} s  rows {rows}")
+
+
+def _importtime(cmd, cwd):
+    # Returns the cumulative import times in seconds of the top-level modules
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *cmd], cwd=cwd, capture_output=True, text=True, check=True
+    )
+    imports = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:") :].split("|")
+        if not module.startswith("  "):  # Not nested
+            imports[module.strip()] = int(cumulative) / 1e6
+    return imports
+
+
+def bench_startup(args):
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    inputs = [os.path.join(repo_dir, "examples", f"solver{i}.json") for i in (1, 2)]
+
+    with tempfile.TemporaryDirectory(dir=args["tmp_dir"]) as tmp_dir:
+        save_to = os.path.join(tmp_dir, "plot")
+        common = ["mkplot.py", "--no-cache", "-t", "1000"]
+        paths = {
+            "dry_run": [*common, "-d", *inputs],
+            "plot": [*common, "-b", args["backend"], "--save-to", save_to, *inputs],
+        }
+        for label, cmd in paths.items():
+            times = []
+            for _ in range(args["repeats"]):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, *cmd], cwd=repo_dir, capture_output=True, check=True)
+                times.append(time.perf_counter() - start)
+
+            imports = _importtime(cmd, repo_dir)
+            top = sorted(imports.items(), key=lambda item: -item[1])[: args["top"]]
+            print(f"{label:>8}: best {min(times):6.3f} s  median {sorted(times)[len(times) // 2]:6.3f} s")
+            top_str = ", ".join(f"{m} {t:.3f}" for m, t in top)
+            print(f"{'':>10}imports {sum(imports.values()):6.3f} s: {top_str}")
+
+
+def _scaled_examples(scale, seed=0):
+    """
+    Scales the example solvers up by resampling their runtimes with a small jitter.
+    """
+    import numpy as np
+    from load_data import Program, load_json_data_from_file
+
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    rng = np.random.default_rng(seed)
+    programs = []
+    for i in (1, 2):
+        file_path = os.path.join(repo_dir, "examples", f"solver{i}.json")
+        prog = load_json_data_from_file(file_path, "rtime", 1000, 0)
+        values = rng.choice(prog.get_values(), len(prog) * scale) * rng.uniform(0.95, 1.05, len(prog) * scale)
+        names = np.array([f"instance{k}" for k in range(len(values))], dtype=object)
+        values = np.minimum(values, 1000)
+        programs.append(Program.from_arrays(prog.get_name(), prog.get_alias(), names, values))
+    return programs
+
+
+def _render(plot_args, data, save_to):
+    """
+    Renders the figure with mkplot options and returns (seconds, file size in bytes).
+    """
+    from mkplot import get_parser, plot_data
+
+    args = vars(get_parser().parse_args([*plot_args, "--save-to", save_to, "unused"]))
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        plot_data(data, args)
+    sec = time.perf_counter() - start
+    return sec, os.path.getsize(f"{os.path.splitext(save_to)[0]}.{args['backend']}")
+
+
+def bench_cactus_decimate(args):
+    with tempfile.TemporaryDirectory(dir=args["tmp_dir"]) as tmp_dir:
+        for scale in args["scales"]:
+            data = _scaled_examples(scale)
+            for backend in args["backends"]:
+                for tol in (None, args["tolerance"]):
+                    plot_args = ["-t", "1000", "-b", backend] + (["--decimate", str(tol)] if tol else [])
+                    sec, size = _render(plot_args, data, os.path.join(tmp_dir, "cactus"))
+                    label = f"decimate {tol}" if tol else "full"
+                    print(
+                        f"{len(data[0]):>9} instances {backend:>4} {label:>14}: "
+                        f"{sec:8.2f} s  {size / 1024:10.1f} KB"
+                    )
+
+
+def bench_rasterize(args):
+    with tempfile.TemporaryDirectory(dir=args["tmp_dir"]) as tmp_dir:
+        data = _scaled_examples(args["scale"])
+        print(f"# {len(data[0])} instances per solver")
+        for plot_type in ("cactus", "scatter"):
+            for backend in args["backends"]:
+                for raster in (False, True):
+                    plot_args = ["-p", plot_type, "-t", "1000", "-b", backend]
+                    if plot_type == "scatter":
+                        plot_args += ["--x_log", "--y_log", "--y_min", "0.1"]
+                    if raster:
+                        plot_args += ["--rasterize", "--raster_dpi", str(args["dpi"])]
+                    sec, size = _render(plot_args, data, os.path.join(tmp_dir, plot_type))
+                    label = f"raster {args['dpi']} dpi" if raster else "vector"
+                    print(f"{plot_type:>8} {backend:>4} {label:>15}: {sec:8.2f} s  {size / 1024:10.1f} KB")
+
+
+def bench_render_leak(args):
+    """
+    Renders many figures in one process with the same plotter objects, optionally from several
+    threads, and fails if the memory or the global matplotlib state grows. A leak grows the
+    memory linearly, so the memory growth is measured over the second half of the figures while
+    the first half absorbs steps of the allocator.
+    """
+    import gc
+    from concurrent.futures import ThreadPoolExecutor
+    import matplotlib
+    from matplotlib._pylab_helpers import Gcf
+    from cactus import Cactus
+    from mkplot import get_parser
+    from scatter import Scatter
+
+    data = _scaled_examples(1)
+    rc_before = dict(matplotlib.rcParams)
+    with tempfile.TemporaryDirectory(dir=args["tmp_dir"]) as tmp_dir:
+
+        def plot_args(*extra, save_to):
+            extra = [*extra, "-t", "1000", "-b", args["backend"], "--save-to", os.path.join(tmp_dir, save_to)]
+            return vars(get_parser().parse_args([*extra, "unused"]))
+
+        plotters = [
+            Cactus(plot_args(save_to="cactus")),
+            Scatter(plot_args("-p", "scatter", "--x_log", "--y_log", "--y_min", "0.1", save_to="scatter")),
+        ]
+
+        def render(i):
+            plotters[i % len(plotters)].create(data)
+
+        # Caches of fonts, text layouts, ... fill up during the warm up
+        nof_figures, warmup = args["figures"], args["warmup"]
+        rss = []
+        with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(args["threads"]) as pool:
+            for i in range(warmup):
+                render(i)
+
+            start = time.perf_counter()
+            for lo, hi in ((0, nof_figures // 2), (nof_figures // 2, nof_figures)):
+                gc.collect()
+                rss.append(_current_rss_mb())
+                list(pool.map(render, range(warmup + lo, warmup + hi)))
+            sec = time.perf_counter() - start
+        gc.collect()
+        rss.append(_current_rss_mb())
+
+    rc_changed = sorted(key for key, value in matplotlib.rcParams.items() if rc_before.get(key) != value)
+    growth = rss[2] - rss[1]
+    ms = sec / nof_figures * 1000
+    print(f"{nof_figures} figures on {args['threads']} threads: {ms:8.1f} ms per figure")
+    print(f"rss after warm up {rss[0]:8.1f} MB, half way {rss[1]:8.1f} MB, at the end {rss[2]:8.1f} MB")
+    print(f"open pyplot figures: {len(Gcf.figs)}, changed rc parameters: {rc_changed}")
+
+    if growth > args["max_growth"] or Gcf.figs or rc_changed:
+        raise SystemExit(1)
+
+
+def bench_portfolio(args):
+    from portfolio import exact_portfolio, greedy_portfolio, runtime_matrix
+
+    programs = _synthetic_programs(args["instances"], args["solvers"], solved_ratio=args["solved_ratio"])
+    start = time.perf_counter()
+    times = runtime_matrix(programs)
+    print(f"{'matrix':>12}: {time.perf_counter() - start:8.3f} s  {times.shape[0]} x {times.shape[1]}")
+
+    start = time.perf_counter()
+    chosen, coverage = greedy_portfolio(times, args["k"])
+    print(f"{'greedy':>12}: {time.perf_counter() - start:8.3f} s  k={len(chosen)} solved {coverage[-1]}")
+
+    for k in range(1, args["exact_k"] + 1):
+        start = time.perf_counter()
+        chosen, count = exact_portfolio(times, k)
+        print(f"{f'exact k={k}':>12}: {time.perf_counter() - start:8.3f} s  solved {count}")
+
+
+def bench_generate(args):
+    paths = generate_result_set(
+        args["out_dir"],
+        args["solvers"],
+        args["instances"],
+        args["solved_ratio"],
+        args["timeout"],
+        args["extra_fields"],
+        args["distribution"],
+        args["seed"],
+    )
+    for file_path in paths:
+        print(f"{file_path}: {os.path.getsize(file_path) / (1024 * 1024):8.1f} MB")
+
+
+def _pipeline_task(data_paths, plot_args):
+    """
+    Runs the mkplot.py pipeline on the inputs and returns its profile report and output size.
+    """
+    from mkplot import get_parser, run
+    from profiling import session
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        report_path = os.path.join(tmp_dir, "profile.json")
+        save_to = os.path.join(tmp_dir, "plot")
+        args = vars(get_parser().parse_args([*plot_args, "--no-cache", "--save-to", save_to, *data_paths]))
+        with contextlib.redirect_stdout(io.StringIO()), session(report_path, trace_memory=False):
+            run(args)
+        with open(report_path) as f:
+            report = json.load(f)
+        return report, os.path.getsize(f"{save_to}.{args['backend']}")
+
+
+def bench_pipeline(args):
+    """
+    Times load_data -> join_data -> Cactus/Scatter -> save for every size, plot type and backend,
+    each run in a fresh process (so start up and imports are included), keeping the fastest repeat.
+    """
+    keys = ("solvers", "solved_ratio", "timeout", "extra_fields", "distribution", "seed", "mkplot_args")
+    config = {key: args[key] for key in keys}
+    results = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "config": config, "versions": {}, "cases": []}
+
+    with tempfile.TemporaryDirectory(dir=args["tmp_dir"]) as tmp_dir:
+        for nof_instances in args["instances"]:
+            print(f"# Generating {args['solvers']} x {nof_instances} instances ...")
+            data_paths = generate_result_set(
+                os.path.join(tmp_dir, str(nof_instances)),
+                args["solvers"],
+                nof_instances,
+                args["solved_ratio"],
+                args["timeout"],
+                args["extra_fields"],
+                args["distribution"],
+                args["seed"],
+            )
+            input_mb = sum(os.path.getsize(path) for path in data_paths) / (1024 * 1024)
+
+            for plot_type in args["plot_types"]:
+                plot_args = ["-p", plot_type, "-t", str(args["timeout"])]
+                inputs = data_paths
+                if plot_type == "scatter":
+                    plot_args += ["--x_log", "--y_log", "--y_min", "0.1"]
+                    inputs = data_paths[:2]
+                for backend in args["backends"]:
+                    case_args = plot_args + ["-b", backend] + shlex.split(args["mkplot_args"])
+                    runs = [_run_isolated(_pipeline_task, inputs, case_args) for _ in range(args["repeats"])]
+                    sec, rss, (report, size) = min(runs, key=lambda res: res[0])
+                    results["versions"] = report["versions"]
+
+                    nof_loaded = nof_instances * len(inputs)
+                    case = {
+                        "case": f"{plot_type}/{backend}/{len(inputs)}x{nof_instances}",
+                        "seconds": sec,
+                        "instances_per_s": nof_loaded / sec,
+                        "input_mb": input_mb * len(inputs) / len(data_paths),
+                        "max_rss_mb": rss,
+                        "output_kb": size / 1024,
+                        "stages": {entry["stage"]: entry["wall_s"] for entry in report["stages"]},
+                    }
+                    results["cases"].append(case)
+                    print(
+                        f"{case['case']:>28}: {sec:8.2f} s  {case['instances_per_s']:12.0f} inst/s  "
+                        f"peak rss {rss:8.1f} MB  output {case['output_kb']:9.1f} KB"
+                    )
+
+    if args["out"]:
+        with open(args["out"], "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"# Results written to: {args['out']}")
+
+
+def bench_compare(args):
+    """
+    Compares the time and peak memory of the cases of two pipeline reports and fails if
+    any case got slower or larger than the threshold allows.
+    """
+    with open(args["baseline"]) as f:
+        baseline = {case["case"]: case for case in json.load(f)["cases"]}
+    with open(args["current"]) as f:
+        current = json.load(f)["cases"]
+
+    limit = 1 + args["threshold"]
+    regressions = []
+    print(f"# {'case':>28} {'time':>21} {'ratio':>7} {'peak rss MB':>21} {'ratio':>7}")
+    for case in current:
+        base = baseline.get(case["case"])
+        if base is None:
+            print(f"  {case['case']:>28}: not in the baseline")
+            continue
+
+        time_ratio = case["seconds"] / base["seconds"]
+        rss_ratio = case["max_rss_mb"] / base["max_rss_mb"]
+        regressed = time_ratio > limit or rss_ratio > limit
+        print(
+            f"  {case['case']:>28} {base['seconds']:9.2f} -> {case['seconds']:8.2f} {time_ratio:6.2f}x "
+            f"{base['max_rss_mb']:9.1f} -> {case['max_rss_mb']:8.1f} {rss_ratio:6.2f}x"
+            + ("  REGRESSION" if regressed else "")
+        )
+        if regressed:
+            regressions.append(case["case"])
+            # Point at the stages that got slower
+            for name, sec in case["stages"].items():
+                base_sec = base["stages"].get(name)
+                if base_sec and sec > args["min_stage_s"] and sec / base_sec > limit:
+                    print(f"  {'':>28}   {name}: {base_sec:.3f} -> {sec:.3f} s")
+
+    if regressions:
+        print(f"# {len(regressions)} regressions above {args['threshold']:.0%}")
+        raise SystemExit(1)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--tmp_dir", default=None, help="Directory for the synthetic input files")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("json_load", help="Compare json.load against the streaming json loader")
+    p.add_argument("--instances", type=int, default=1000000, help="Number of instances in the result file")
+    p.add_argument("--extra_fields", type=int, default=1, help="Number of non-rtime fields per instance")
+    p.set_defaults(func=bench_json_load)
+
+    p = sub.add_parser("join", help="Compare the set/dict join against the sorted-index join_data")
+    p.add_argument("--instances", type=int, nargs="+", default=[10000, 100000, 1000000])
+    p.add_argument("--programs", type=int, default=2, help="Number of programs to join")
+    p.set_defaults(func=bench_join)
+
+    p = sub.add_parser("db_problem_set", help="Compare inlined problem sets against the temporary table")
+    p.add_argument("--problems", type=int, default=200000, help="Number of problems in the database")
+    p.add_argument("--experiments", type=int, default=10, help="Number of experiments to query")
+    p.add_argument("--subset_sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    p.set_defaults(func=bench_db_problem_set)
+
+    p = sub.add_parser("startup", help="Measure the cold start of the mkplot.py dry-run and plot paths")
+    p.add_argument("--repeats", type=int, default=5, help="Number of runs per path")
+    p.add_argument("--backend", default="pdf", help="Backend of the plot path")
+    p.add_argument("--top", type=int, default=5, help="Number of slowest top-level imports to show")
+    p.set_defaults(func=bench_startup)
+
+    p = sub.add_parser("cactus_decimate", help="File size and render time of decimated cactus plots")
+    p.add_argument("--scales", type=int, nargs="+", default=[100, 1000], help="Scale factors of the examples")
+    p.add_argument("--backends", nargs="+", default=["pdf", "svg", "png"])
+    p.add_argument("--tolerance", type=float, default=0.5, help="Decimation tolerance in pixels")
+    p.set_defaults(func=bench_cactus_decimate)
+
+    p = sub.add_parser("rasterize", help="File size and render time of rasterized data layers")
+    p.add_argument("--scale", type=int, default=200, help="Scale factor of the examples")
+    p.add_argument("--backends", nargs="+", default=["pdf", "svg", "ps"])
+    p.add_argument("--dpi", type=int, default=300, help="Resolution of the rasterized layers")
+    p.set_defaults(func=bench_rasterize)
+
+    p = sub.add_parser("portfolio", help="Time the greedy and exact portfolio selection")
+    p.add_argument("--solvers", type=int, default=200, help="Number of solver configurations")
+    p.add_argument("--instances", type=int, default=20000, help="Number of instances")
+    p.add_argument("--solved_ratio", type=float, default=0.3, help="Fraction of instances solved per solver")
+    p.add_argument("--k", type=int, default=10, help="Greedy portfolio size")
+    p.add_argument("--exact_k", type=int, default=2, help="Largest exact portfolio size")
+    p.set_defaults(func=bench_portfolio)
+
+    p = sub.add_parser("render_leak", help="Render many figures in one process and check for leaks")
+    p.add_argument("--figures", type=int, default=1000, help="Number of figures to render after the warm up")
+    p.add_argument("--warmup", type=int, default=200, help="Number of figures rendered before measuring")
+    p.add_argument("--threads", type=int, default=1, help="Number of rendering threads")
+    p.add_argument("--backend", default="png", help="Backend of the figures")
+    p.add_argument(
+        "--max_growth", type=float, default=10, help="Allowed memory growth over the second half in MB"
+    )
+    p.set_defaults(func=bench_render_leak)
+
+    p = sub.add_parser("generate", help="Write a synthetic result set, one json file per solver")
+    _add_generator_args(p)
+    p.add_argument("--instances", type=int, default=100000, help="Number of instances per solver")
+    p.add_argument("--out_dir", required=True, help="Directory of the result files")
+    p.set_defaults(func=bench_generate)
+
+    p = sub.add_parser("pipeline", help="Time whole mkplot.py runs on synthetic result sets")
+    _add_generator_args(p)
+    p.add_argument("--instances", type=int, nargs="+", default=[10000, 100000], help="Instances per solver")
+    p.add_argument("--plot_types", nargs="+", default=["cactus", "scatter"], choices=["cactus", "scatter"])
+    p.add_argument("--backends", nargs="+", default=["png", "pdf", "svg"])
+    p.add_argument("--mkplot_args", default="", help="Extra mkplot.py options, e.g. '--decimate 0.5'")
+    p.add_argument("--repeats", type=int, default=3, help="Runs per case, the fastest is reported")
+    p.add_argument("--out", default=None, help="Write the json results to this file")
+    p.set_defaults(func=bench_pipeline)
+
+    p = sub.add_parser("compare", help="Compare two pipeline results and fail on regressions")
+    p.add_argument("baseline", help="Json results of the baseline run")
+    p.add_argument("current", help="Json results of the new run")
+    p.add_argument(
+        "--threshold", type=float, default=0.1, help="Allowed relative increase of time and memory"
+    )
+    p.add_argument(
+        "--min_stage_s", type=float, default=0.01, help="Only show slower stages taking at least this long"
+    )
+    p.set_defaults(func=bench_compare)
+
+    return parser
+
+
+def _add_generator_args(p):
+    p.add_argument("--solvers", type=int, default=2, help="Number of solvers (result files)")
+    p.add_argument("--solved_ratio", type=float, default=0.7, help="Fraction of solved instances per solver")
+    p.add_argument("--timeout", type=int, default=1000, help="Timeout of the unsolved instances")
+    p.add_argument("--extra_fields", type=int, default=1, help="Number of non-rtime fields per instance")
+    p.add_argument("--distribution", choices=RUNTIME_DISTRIBUTIONS, default="exp", help="Runtimes of solved")
+    p.add_argument("--seed", type=int, default=0, help="Seed of the first solver, the next ones use seed + k")
+
+
+def main():
+    args = vars(get_parser().parse_args())
+    args["func"](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import time
+import numpy as np
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "cactus_plot")
+
+
+class NpzCache:
+    """
+    Size-bounded directory of numpy .npz archives addressed by a string key.
+    The least recently used entries are evicted once the total size exceeds the bound.
+    """
+
+    def __init__(self, cache_dir=None, max_size_mb=512):
+        self.cache_dir = cache_dir if cache_dir is not None else default_cache_dir()
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.writable = True
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".npz")
+
+    def _read(self, key: str):
+        """
+        Returns the dict of arrays stored under the key, or None if there is no entry.
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with np.load(entry_path, allow_pickle=False) as entry:
+                res = {k: entry[k] for k in entry.files}
+        except (OSError, KeyError, ValueError):
+            return None
+
+        # Mark as recently used for the eviction policy
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return res
+
+    def _write(self, key: str, **arrays):
+        """
+        Stores the arrays under the key. The data is loaded anyway, so a cache that cannot be
+        written is reported once and then skipped instead of failing the run.
+        """
+        if not self.writable:
+            return
+        entry_path = self._entry_path(key)
+
+        # Write to a temporary file first so concurrent readers never see partial entries
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, entry_path)
+        except OSError as e:
+            print(f"# Cannot write to the cache in {self.cache_dir} ({e}), continuing without it")
+            self.writable = False
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        self.evict()
+
+    def _entries(self):
+        try:
+            files = [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir)]
+            files = [f for f in files if f.endswith(".npz")]
+        except OSError:  # No cache yet, or not a directory
+            return []
+
+        entries = []
+        for f in files:
+            try:
+                st = os.stat(f)
+            except FileNotFoundError:
+                continue  # Removed by a concurrent process
+            entries.append((st.st_mtime, st.st_size, f))
+        return entries
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits the size bound.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, f in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(f)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, f in self._entries():
+            try:
+                os.remove(f)
+            except FileNotFoundError:
+                pass
+
+
+class ResultCache(NpzCache):
+    """
+    On-disk cache of parsed result files.
+
+    Each entry holds the unfiltered columns of one result file for a single stat type
+    (instance names, stat values and status), so any ids/min/max filter can be applied
+    on the arrays. Entries are keyed on the file path, mtime, size and stat type, hence a
+    modified file simply misses the cache.
+    """
+
+    def _key(self, file_path, stat_type) -> str:
+        st = os.stat(file_path)
+        return f"{os.path.abspath(file_path)}\0{st.st_mtime_ns}\0{st.st_size}\0{stat_type}"
+
+    def get(self, file_path, stat_type):
+        """
+        Returns (preamble, names, values, status) or None if there is no valid entry.
+        """
+        entry = self._read(self._key(file_path, stat_type))
+        if entry is None:
+            return None
+        return json.loads(str(entry["preamble"])), entry["names"], entry["values"], entry["status"]
+
+    def put(self, file_path, stat_type, preamble, names, values, status):
+        self._write(
+            self._key(file_path, stat_type),
+            preamble=np.array(json.dumps(preamble)),
+            names=names,
+            values=values,
+            status=status,
+        )
+
+
+class ExperimentCache(NpzCache):
+    """
+    On-disk cache of the solved (problem name, runtime) rows of DB experiments.
+
+    Entries hold the rows fetched within the (max_val, min_val) time bounds of the query, or all
+    rows if the bounds are None (e.g. pre-fetched ones), from which any window can be applied locally.
+    Entries are keyed on the experiment id, the bounds, the query settings of the DB, the library
+    version and a hash of the problem set, and expire after ttl_hours (0 never expires)
+    so that experiments still running when cached are eventually refetched.
+    """
+
+    def __init__(self, cache_dir=None, max_size_mb=512, ttl_hours=24):
+        cache_dir = cache_dir if cache_dir is not None else default_cache_dir()
+        super().__init__(os.path.join(cache_dir, "db"), max_size_mb)
+        self.ttl = ttl_hours * 3600
+
+    @staticmethod
+    def _key(exp_id, db, problem_set, bounds) -> str:
+        from database import LIBRARY_VERSION
+
+        if problem_set is None:
+            set_hash = "all"
+        else:
+            set_hash = hashlib.sha1("\n".join(sorted(set(problem_set))).encode()).hexdigest()
+        settings = f"{db.ltb_problems}\0{db.include_incorrect}\0{LIBRARY_VERSION}\0{set_hash}"
+        # The unbounded entries keep the key format of before the bounds were added
+        bounds = "" if bounds == (None, None) else f"\0{bounds[0]!r}\0{bounds[1]!r}"
+        return f"{exp_id}\0{settings}{bounds}"
+
+    def get(self, exp_id, db, problem_set, bounds=(None, None)):
+        """
+        Returns the (names, runtimes) arrays of the experiment fetched within the (max_val, min_val)
+        bounds, or None if there is no fresh entry.
+        """
+        entry = self._read(self._key(exp_id, db, problem_set, bounds))
+        if entry is None:
+            return None
+        if self.ttl and time.time() - float(entry["created"]) > self.ttl:
+            return None
+        return entry["names"], entry["runtimes"]
+
+    def put(self, exp_id, db, problem_set, names, runtimes, bounds=(None, None)):
+        self._write(
+            self._key(exp_id, db, problem_set, bounds),
+            created=np.array(time.time()),
+            names=np.asarray(names, dtype=str),
+            runtimes=runtimes,
+        )
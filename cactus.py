@@ -1,12 +1,52 @@
 import json
-import matplotlib.pyplot as plt
 from matplotlib import __version__ as mpl_version
+from matplotlib import ticker
 import math
 import numpy as np
 from typing import List
 
 from load_data import Program
 from plot import Plot
+from profiling import stage
+from units import is_time_stat
+
+
+def decimate_curve(xs, ys, x_lim, y_lim, x_log, y_log, size_px, tol):
+    """
+    Reduces a monotone (non-decreasing in x and y) curve to the points needed to draw it
+    within tol pixels at the given size in pixels of the data area.
+
+    The curve is mapped to display coordinates and cut into tol x tol cells. As the curve is
+    monotone it passes each cell in one contiguous run, so keeping the first and last point
+    of every run bounds the deviation of the drawn line by tol * sqrt(2) pixels.
+    """
+    if len(xs) <= 2:
+        return xs, ys
+
+    def to_cells(vals, lim, log, px):
+        lo, hi = lim
+        if log:
+            if lo <= 0:
+                # A log axis ignores a non-positive limit and autoscales down to at most the smallest
+                # positive value, so using that value only makes the cells finer than needed
+                positive = vals[vals > 0]
+                lo = positive.min() if len(positive) else hi
+            # Non-positive values are clipped to the axis anyway
+            vals = np.log10(np.maximum(vals, lo))
+            lo, hi = np.log10(lo), np.log10(hi)
+        scale = px / tol / max(hi - lo, 1e-300)
+        return np.floor((np.clip(vals, lo, hi) - lo) * scale).astype(np.int64)
+
+    cx = to_cells(xs, x_lim, x_log, size_px[0])
+    cy = to_cells(ys, y_lim, y_log, size_px[1])
+
+    # Keep the first and the last point of every run of equal cells
+    change = (np.diff(cx) != 0) | (np.diff(cy) != 0)
+    keep = np.zeros(len(xs), dtype=bool)
+    keep[0] = keep[-1] = True
+    keep[1:] |= change
+    keep[:-1] |= change
+    return xs[keep], ys[keep]
 
 
 class Cactus(Plot, object):
@@ -24,23 +64,46 @@ class Cactus(Plot, object):
         with open(self.def_path, "r") as fp:
             self.linestyles = json.load(fp)["cactus_linestyle"]
 
-    def create(self, data: List[Program]):
+    def _x_max(self, data: List[Program]):
+        if self.x_max:
+            return self.x_max
+        # Make sure that the last values are not crammed in the corner
+        return math.ceil(max([len(prog) for prog in data]) / float(100)) * 100
+
+    def _bounded(self, data: List[Program]) -> bool:
+        # Only the first statistic is bounded by the timeout if it is a time, the other loaded ones are not
+        return all(prog.stat in (None, self.stat_type) and is_time_stat(prog.stat) for prog in data)
+
+    def _y_max(self, data: List[Program]):
+        if self.y_max:
+            return self.y_max
+        if self._bounded(data):
+            return self.timeout
+        return max([prog.get_max_val() for prog in data if len(prog)], default=1)
+
+    def _line(self, ax, prog: Program, x_max, y_max):
+        xs = np.arange(1, len(prog) + 1)  # xs (separate for each line)
+        ys = prog.get_sorted_values()
+        if self.decimate:
+            x_lim, y_lim, size_px = (self.x_min, x_max), (self.y_min, y_max), self.size_px(ax)
+            xs, ys = decimate_curve(xs, ys, x_lim, y_lim, self.x_log, self.y_log, size_px, self.decimate)
+        return [xs, ys]
+
+    def draw(self, ax, data: List[Program]):
         """
-        Does the plotting.
+        Draws the cactus lines of the programs on the axes.
         """
 
-        if self.seaborn:
-            import seaborn as sns
-
-            sns.set()  # set_theme
+        x_max, y_max = self._x_max(data), self._y_max(data)
 
         # Make x and y line plot from the data
         coords = []
-        for prog in data:
-            coords.append(np.arange(1, len(prog) + 1))  # xs (separate for each line)
-            coords.append(np.array(sorted(prog.get_values())))
+        with stage("sort"):  # and decimate
+            for prog in data:
+                coords += self._line(ax, prog, x_max, y_max)
 
-        lines = plt.plot(*coords, zorder=3)
+        lines = ax.plot(*coords, zorder=3, rasterized=self.rasterize)
+        self.data_artists = lines
         # Compute line styles - do not want to do it if using seaborn
         if not self.byname:  # by default, assign fist line to best tool
             lmap = lambda i: i
@@ -53,36 +116,30 @@ class Cactus(Plot, object):
         # Set the line-styles if not using seaborn
         if not self.seaborn:
             for i, l in enumerate(lines):
-                plt.setp(l, **self.linestyles[lmap(i) % len(self.linestyles)])
+                l.set(**self.linestyles[lmap(i) % len(self.linestyles)])
 
         # Turning the grid on
         if not self.no_grid:
-            plt.grid(True, color=self.grid_color, ls=self.grid_style, lw=self.grid_width, zorder=1)
-
-        #  Compute the x-axis limit
-        if self.x_max:
-            x_max = self.x_max
-        else:
-            # Make sure that the last values are not crammed in the corner
-            x_max = math.ceil(max([len(prog) for prog in data]) / float(100)) * 100
+            ax.grid(True, color=self.grid_color, ls=self.grid_style, lw=self.grid_width, zorder=1)
 
         # Set the axis limits
-        plt.xlim(self.x_min, x_max)
-        plt.ylim(self.y_min, self.y_max if self.y_max else self.timeout)
+        ax.set_xlim(self.x_min, x_max)
+        ax.set_ylim(self.y_min, y_max)
 
         # axes labels
         if self.x_label:
-            plt.xlabel(self.x_label)
+            ax.set_xlabel(self.x_label)
         else:
-            plt.xlabel("instances")
+            ax.set_xlabel("instances")
 
         if self.y_label:
-            plt.ylabel(self.y_label)
+            ax.set_ylabel(self.y_label)
+        elif self._bounded(data):
+            ax.set_ylabel("CPU time (s)")
         else:
-            plt.ylabel("CPU time (s)")
+            ax.set_ylabel(data[0].stat)
 
         # choosing logarithmic scales if needed
-        ax = plt.gca()
         if self.x_log:
             ax.set_xscale("log")
         if self.y_log:
@@ -92,30 +149,33 @@ class Cactus(Plot, object):
             ax.set_xticklabels(ax.get_xticks(), self.f_props)
             ax.set_yticklabels(ax.get_yticks(), self.f_props)
 
-        strFormatter = plt.FormatStrFormatter("%d")
-        logFormatter = plt.LogFormatterMathtext(base=10)
+        strFormatter = ticker.FormatStrFormatter("%d")
+        logFormatter = ticker.LogFormatterMathtext(base=10)
         ax.xaxis.set_major_formatter(strFormatter if not self.x_log else logFormatter)
         ax.yaxis.set_major_formatter(strFormatter if not self.y_log else logFormatter)
 
-        # Making the legend
-        if self.lgd_loc != "off":
-            lgtext = [prog.get_alias() for prog in data]
-            lg = ax.legend(
-                lines,
-                lgtext,
-                ncol=self.lgd_ncol,
-                loc=self.lgd_loc,
-                fancybox=self.lgd_fancy,
-                shadow=self.lgd_shadow if self.lgd_alpha == 1.0 else False,
-            )
-            fr = lg.get_frame()
-            fr.set_lw(1)
-            fr.set_alpha(self.lgd_alpha)
-            fr.set_edgecolor("black")
-
         # Setting frame thickness
         for axis in ["top", "bottom", "left", "right"]:
             ax.spines[axis].set_linewidth(1)
 
-        plt.savefig(self.save_to, bbox_inches="tight", transparent=self.transparent)
-        print("Saved to:", self.save_to)
+        return lines, [prog.get_alias() for prog in data]
+
+    def update(self, ax, data: List[Program], changed) -> bool:
+        """
+        Replaces the lines of the changed programs and moves the axis limits if needed.
+        """
+        if len(data) != len(self.data_artists):
+            return False
+
+        x_max, y_max = self._x_max(data), self._y_max(data)
+        if (x_max, y_max) != (ax.get_xlim()[1], ax.get_ylim()[1]):
+            # Without a timeout to bound them (e.g. mempeak), the values give the y-axis limit
+            ax.set_xlim(right=x_max)
+            ax.set_ylim(top=y_max)
+            if self.decimate:
+                # The decimation of every line depends on the axis limits
+                changed = range(len(data))
+
+        for i in changed:
+            self.data_artists[i].set_data(*self._line(ax, data[i], x_max, y_max))
+        return True
@@ -1,41 +1,123 @@
-import mysql.connector as db_connect
+import math
 import traceback
 
 LIBRARY_VERSION = 64
 INCLUDE_INCORRECT = False
 
 
-class DB:
-    def __init__(self, ltb_problems=False):
+def _mysql_connect():
+    # Let this fail if not present
+    import db_cred
+    import mysql.connector as db_connect
+
+    return db_connect.connect(**db_cred.db_connection_details)
 
-        # Let this fail if not present
-        import db_cred
 
-        # Set the DB connection details
-        self.db_conn_details = db_cred.db_connection_details
+class DB:
+    def __init__(self, ltb_problems=False, connect=None, placeholder="%s", problem_set_table=True):
+        """
+        The connection is opened on the first query and reused until close() is called.
+        connect is a factory returning a DB-API connection, the iProver MySQL DB by default,
+        and placeholder is the parameter marker of its driver.
+        With problem_set_table the problem set is loaded once per connection into a
+        temporary table that the queries join against, instead of inlining the names.
+        """
+        self.connect = connect if connect is not None else _mysql_connect
+        self.placeholder = placeholder
+        self.problem_set_table = problem_set_table
+        self.conn = None
+        self.loaded_problem_set = None
 
         self.ltb_problems = ltb_problems
         self.include_incorrect = INCLUDE_INCORRECT
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            finally:
+                self.conn = None
+                self.loaded_problem_set = None
+
+    def _connection(self):
+        if self.conn is None:
+            self.conn = self.connect()
+        return self.conn
+
     def _fetch(self, query):
         try:
-            conn = db_connect.connect(**self.db_conn_details)
-            curs = conn.cursor()
-
-            curs.execute(query)
-            res = curs.fetchall()
-            return res
+            curs = self._connection().cursor()
+            try:
+                curs.execute(query)
+                return curs.fetchall()
+            finally:
+                curs.close()
 
         except Exception as err:
             print(err)
             print(traceback.format_exc())
-        finally:
-            if curs:
+            # Drop the connection as it might be broken
+            self.close()
+
+    def _fetch_batches(self, query, batch_size):
+        """
+        Yields the result rows in lists of at most batch_size rows without buffering the whole result.
+        """
+        try:
+            curs = self._connection().cursor()
+            try:
+                curs.execute(query)
+                while True:
+                    rows = curs.fetchmany(batch_size)
+                    if not rows:
+                        return
+                    yield rows
+            finally:
                 curs.close()
-            if conn:
-                conn.close()
 
-    def _base_query_solved_problemrun(self, select, exp_id, upper_time_bound, problem_set=None):
+        except Exception:
+            # Drop the connection as it might be broken
+            self.close()
+            raise
+
+    def _load_problem_set(self, problem_set, batch_size=1000):
+        """
+        Bulk-loads the problem names into the indexed temporary table ProblemSet, once per connection.
+        """
+        problem_set = tuple(problem_set)
+        if problem_set == self.loaded_problem_set:
+            return
+
+        self.loaded_problem_set = None
+        curs = self._connection().cursor()
+        try:
+            curs.execute(
+                "CREATE TEMPORARY TABLE IF NOT EXISTS ProblemSet (ProblemName VARCHAR(255) PRIMARY KEY)"
+            )
+            curs.execute("DELETE FROM ProblemSet")
+
+            insert = f"INSERT INTO ProblemSet (ProblemName) VALUES ({self.placeholder})"
+            names = [(name,) for name in sorted(set(problem_set))]
+            for i in range(0, len(names), batch_size):
+                curs.executemany(insert, names[i : i + batch_size])
+        finally:
+            curs.close()
+
+        self.loaded_problem_set = problem_set
+
+    def _base_query_solved_problemrun(
+        self, select, exp_id, upper_time_bound, problem_set=None, lower_time_bound=None, batch_size=None
+    ):
+        """
+        Builds and runs the query over the solved problem runs of one experiment id or a list of ids.
+        With a batch_size the rows are streamed as a generator of row batches.
+        """
         sql_query = """
             {0}
             FROM ProblemRun PR
@@ -55,13 +137,26 @@ class DB:
                      JOIN Problem P ON P.ProblemID = PV.Problem
                      """
 
+        # Restrict to the problem set through the temporary table
+        if problem_set is not None and self.problem_set_table:
+            self._load_problem_set(problem_set)
+            sql_query += """
+                     JOIN ProblemSet PS ON PS.ProblemName = P.ProblemName
+                     """
+
         sql_query += """
-                WHERE PR.Experiment={0}
+                WHERE PR.Experiment IN ({0})
                 """.format(
-            exp_id
+            ", ".join(str(int(e)) for e in (exp_id if isinstance(exp_id, (list, tuple)) else [exp_id]))
         )
 
-        if problem_set is not None:  # TODO can really only do this if Library ID is provided..
+        if problem_set is not None and self.problem_set_table:
+            sql_query += """
+                         AND PV.Version={0}
+                        """.format(
+                LIBRARY_VERSION
+            )
+        elif problem_set is not None:  # TODO can really only do this if Library ID is provided..
             sql_query += """
                          AND PR.Problem in
                          (
@@ -74,12 +169,18 @@ class DB:
                 '"' + '", "'.join(problem_set) + '"', LIBRARY_VERSION
             )
 
-        # Apply upper time bound if set
-        if upper_time_bound is not None:
+        # Apply the time bounds if set
+        if upper_time_bound is not None and not math.isinf(upper_time_bound):
             sql_query += """
                     AND PR.Runtime <= {0}
                     """.format(
-                upper_time_bound
+                float(upper_time_bound)
+            )
+        if lower_time_bound is not None and not math.isinf(lower_time_bound):
+            sql_query += """
+                    AND PR.Runtime >= {0}
+                    """.format(
+                float(lower_time_bound)
             )
 
         if self.ltb_problems:
@@ -101,21 +202,56 @@ class DB:
         # Execute
         sql_query += ";"
 
+        if batch_size is not None:
+            return self._fetch_batches(sql_query, batch_size)
         return self._fetch(sql_query)
 
-    def get_solved_problem_name_time(self, exp_id, upper_time_bound=None, problem_set=None):
+    def get_solved_problem_name_time(
+        self, exp_id, upper_time_bound=None, problem_set=None, lower_time_bound=None
+    ):
+
+        select = "SELECT P.ProblemName, PR.Runtime"
+        res = self._base_query_solved_problemrun(
+            select, exp_id, upper_time_bound, problem_set, lower_time_bound
+        )
+        return res
+
+    def iter_solved_problem_name_time_batches(
+        self, exp_ids, upper_time_bound=None, problem_set=None, lower_time_bound=None, batch_size=10000
+    ):
+        """
+        Streams the solved (Experiment, ProblemName, Runtime) rows of all experiments from a
+        single query in lists of at most batch_size rows.
+        """
+        select = "SELECT PR.Experiment, P.ProblemName, PR.Runtime"
+        return self._base_query_solved_problemrun(
+            select, list(exp_ids), upper_time_bound, problem_set, lower_time_bound, batch_size
+        )
 
-        select = "SELECT ProblemName, PR.Runtime"
-        res = self._base_query_solved_problemrun(select, exp_id, upper_time_bound, problem_set)
+    def get_solved_problem_name_time_batch(
+        self, exp_ids, upper_time_bound=None, problem_set=None, lower_time_bound=None
+    ):
+        """
+        Fetches the solved (ProblemName, Runtime) pairs of all experiments in one query.
+        Returns a dict from each experiment id to its list of rows.
+        """
+        res = {str(exp_id): [] for exp_id in exp_ids}
+        batches = self.iter_solved_problem_name_time_batches(
+            exp_ids, upper_time_bound, problem_set, lower_time_bound
+        )
+        # Split the rows per experiment
+        for rows in batches:
+            for exp_id, name, runtime in rows:
+                res[str(exp_id)].append((name, runtime))
         return res
 
 
 def main():
-    db = DB()
-    r = db._fetch("SELECT * FROM Collection")
-    print(r)
-    r = db.get_solved_problem_name_time(117213)
-    print(r)
+    with DB() as db:
+        r = db._fetch("SELECT * FROM Collection")
+        print(r)
+        r = db.get_solved_problem_name_time(117213)
+        print(r)
 
 
 if __name__ == "__main__":
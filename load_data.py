@@ -1,13 +1,117 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections.abc import Mapping
 from typing import List, Dict
 import json
+import os
+import pickle
+import re
 import numpy as np
 
+from cache import ExperimentCache, ResultCache
+from profiling import count, stage
+from units import is_time_stat, parse_values
+
+
+class InstanceView(Mapping):
+    """
+    Read-only {instance name: value} view of a Program.
+    """
+
+    __slots__ = ("_prog",)
+
+    def __init__(self, prog):
+        self._prog = prog
+
+    def __getitem__(self, inst_name) -> float:
+        return self._prog.values[self._prog.get_index()[inst_name]]
+
+    def __iter__(self):
+        return iter(self._prog.names.tolist())
+
+    def __len__(self):
+        return len(self._prog)
+
 
 class Program:
+    """
+    Solved instances of a program stored as a name array and an aligned float64 value array.
+
+    Programs loaded with several statistics also keep a {stat: values} table of columns aligned
+    with the names, and stat names the column held in values (None if unknown). attempted is the
+    number of instances the program was run on, solved or not, if its input lists them.
+    """
+
+    __slots__ = (
+        "name",
+        "alias",
+        "names",
+        "values",
+        "columns",
+        "stat",
+        "attempted",
+        "_index",
+        "_sorted_values",
+    )
+
     def __init__(self, program_name: str, program_alias: str, positive_instance_stats: Dict[str, float]):
         self.name = program_name
         self.alias = program_alias
-        self.stats = positive_instance_stats
+        self.names = np.array(list(positive_instance_stats.keys()), dtype=object)
+        self.values = np.fromiter(positive_instance_stats.values(), dtype=np.float64, count=len(self.names))
+        self.values.flags.writeable = False
+        self.columns = {}
+        self.stat = None
+        self.attempted = None
+        self._index = None
+        self._sorted_values = None
+
+    @classmethod
+    def from_arrays(
+        cls, program_name: str, program_alias: str, names, values, columns=None, stat=None, attempted=None
+    ) -> "Program":
+        """
+        Builds a program directly from aligned instance name and value arrays, and optionally
+        the aligned columns of all loaded statistics.
+        """
+        prog = cls.__new__(cls)
+        prog.name = program_name
+        prog.alias = program_alias
+        prog.names = np.asarray(names)
+        # A read-only view, so arrays of the caller stay writeable
+        prog.values = np.asarray(values, dtype=np.float64).view()
+        prog.values.flags.writeable = False
+        prog.columns = columns if columns is not None else {}
+        prog.stat = stat
+        prog.attempted = attempted
+        prog._index = None
+        prog._sorted_values = None
+        return prog
+
+    def select(self, stat: str) -> "Program":
+        """
+        Returns the program with the values of another loaded statistic on the same instances.
+        """
+        if stat == self.stat:
+            return self
+        if stat not in self.columns:
+            raise ValueError(f"{self.alias} has no {stat} values")
+        return Program.from_arrays(
+            self.name, self.alias, self.names, self.columns[stat], self.columns, stat, self.attempted
+        )
+
+    def take(self, index, names=None) -> "Program":
+        """
+        Returns the program restricted to the instances at the index (positions or a mask),
+        with all loaded columns kept aligned. The names of the result may be passed if known.
+        """
+        values = self.values[index]
+        columns = {stat: values if stat == self.stat else col[index] for stat, col in self.columns.items()}
+        names = self.names[index] if names is None else names
+        return Program.from_arrays(self.name, self.alias, names, values, columns, self.stat, self.attempted)
+
+    def has_stat(self, stat: str) -> bool:
+        return stat == self.stat or stat in self.columns
 
     def get_name(self) -> str:
         return self.name
@@ -16,67 +120,412 @@ class Program:
         return self.alias
 
     def get_max_val(self) -> float:
-        return max(self.get_values())
+        if len(self) == 0:
+            raise ValueError(f"{self.alias} has no solved instances")
+        return self.get_sorted_values()[-1]
 
     def get_min_val(self) -> float:
-        return min(self.get_values())
+        if len(self) == 0:
+            raise ValueError(f"{self.alias} has no solved instances")
+        return self.get_sorted_values()[0]
 
     def get_average_val(self) -> float:
-        return np.average(self.get_values())
+        return np.average(self.values)
+
+    def get_values(self) -> np.ndarray:
+        return self.values
+
+    def get_sorted_values(self) -> np.ndarray:
+        # Computed once as the values never change
+        if self._sorted_values is None:
+            self._sorted_values = np.sort(self.values)
+            self._sorted_values.flags.writeable = False
+        return self._sorted_values
 
-    def get_values(self) -> List[float]:
-        return list(self.stats.values())
+    def get_instance_names(self) -> np.ndarray:
+        return self.names
 
-    def get_instance_names(self) -> List[str]:
-        return list(self.stats.keys())
+    def get_index(self) -> Dict[str, int]:
+        """
+        Returns the instance name to array index map.
+        """
+        if self._index is None:
+            self._index = {inst_name: i for i, inst_name in enumerate(self.names.tolist())}
+        return self._index
 
-    def get_instances(self) -> Dict[str, float]:
-        return self.stats
+    def get_instances(self) -> Mapping:
+        return InstanceView(self)
 
     def __len__(self):
-        return len(self.stats)
+        return len(self.values)
 
     def __str__(self):
         return f"program_{self.get_name()}_alias_{self.get_alias()}_solved_{self.__len__()}"
 
 
-def load_json_data_from_file(file_path, stat_type, max_val, min_val, ids=None) -> Program:
-    with open(file_path, "rb") as f:
-        data = json.load(f)
+class _JsonStream:
+    """
+    Minimal incremental reader for a top-level JSON object.
+
+    Values are decoded one at a time with the C-accelerated raw decoder on a
+    sliding buffer, so only the value currently being decoded is held in memory.
+    """
+
+    _WS = re.compile(r"[ \t\n\r]*")
+
+    def __init__(self, fp, chunk_size=1 << 20):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        # Drop the consumed part of the buffer before extending it
+        chunk = self.fp.read(max(self.chunk_size, len(self.buf) - self.pos))
+        self.buf = self.buf[self.pos :] + chunk
+        self.pos = 0
+        if not chunk:
+            self.eof = True
+        return bool(chunk)
+
+    def _skip_ws(self):
+        while True:
+            self.pos = self._WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self._fill():
+                return
+
+    def next_char(self) -> str:
+        self._skip_ws()
+        if self.pos >= len(self.buf):
+            raise json.JSONDecodeError("Unexpected end of data", self.buf, self.pos)
+        char = self.buf[self.pos]
+        self.pos += 1
+        return char
+
+    def expect(self, char):
+        found = self.next_char()
+        if found != char:
+            raise json.JSONDecodeError(f"Expecting '{char}' but found '{found}'", self.buf, self.pos - 1)
+
+    def decode_value(self):
+        self._skip_ws()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A value touching the buffer end (e.g. a number) might continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def iter_object(self):
+        """
+        Yields the (key, value-reader) pairs of the object starting at the current position.
+        The caller must consume each value before advancing the iterator.
+        """
+        self.expect("{")
+        self._skip_ws()
+        if self.buf[self.pos : self.pos + 1] == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.decode_value()
+            self.expect(":")
+            yield key
+            sep = self.next_char()
+            if sep == "}":
+                return
+            if sep != ",":
+                raise json.JSONDecodeError(f"Expecting ',' or '}}' but found '{sep}'", self.buf, self.pos - 1)
+
+
+def _walk_json_results(file_path, on_entry, stream=False) -> dict:
+    """
+    Calls on_entry(inst_name, entry) for each instance in the result file and returns the preamble.
+    With stream=True the file is parsed incrementally instead of materialising the whole document.
+    """
+    preamble = None
+    if stream:
+        with open(file_path, "r", encoding="utf-8") as f:
+            reader = _JsonStream(f)
+            for key in reader.iter_object():
+                if key == "stats":
+                    # Walk the instances one entry at a time
+                    for inst_name in reader.iter_object():
+                        on_entry(inst_name, reader.decode_value())
+                elif key == "preamble":
+                    preamble = reader.decode_value()
+                else:
+                    reader.decode_value()  # Not used
+    else:
+        with open(file_path, "rb") as f:
+            data = json.load(f)
+        preamble = data.get("preamble")
+        for inst_name, entry in data["stats"].items():
+            on_entry(inst_name, entry)
+
+    if preamble is None:
+        raise KeyError(f"No preamble found in {file_path}")
+    return preamble
+
+
+def _load_json_columns(file_path, stat_types, stream=False, solved_only=False, ids=None):
+    """
+    Parses the instances of a result file into (preamble, names, {stat: values}, status) arrays,
+    reading all statistics in one pass, followed by the number of instances in the file.
+    Values with units (e.g. "214016 KiB") are converted by parse_values and missing values
+    (e.g. for unsolved instances) are stored as NaN.
+    With solved_only, only the solved instances (of ids, if given) are kept, and only the
+    instances of ids are counted.
+    """
+    names, status = [], []
+    raw = {stat: [] for stat in stat_types}
+    attempted = 0
+
+    def on_entry(inst_name, entry):
+        nonlocal attempted
+        if solved_only and ids is not None and inst_name not in ids:
+            return  # Skip entry
+        attempted += 1
+        if solved_only and not entry["status"]:
+            return  # Skip entry
+        names.append(inst_name)
+        status.append(bool(entry["status"]))
+        for stat, col in raw.items():
+            col.append(entry.get(stat))
+
+    preamble = _walk_json_results(file_path, on_entry, stream)
+    columns = {stat: parse_values(col, stat) for stat, col in raw.items()}
+    return preamble, np.array(names, dtype=str), columns, np.array(status, dtype=bool), attempted
+
+
+def _program_from_columns(
+    preamble, names, columns, status, max_val, min_val, ids=None, attempted=None
+) -> Program:
+    # The bounds apply to the first statistic if it is a time, the other columns are kept on the
+    # same instances. Solved instances without a value of the first statistic are left out.
+    # Unless given, the instances the program was run on are all the names (of ids).
+    stat = next(iter(columns))
+    values = columns[stat]
+    mask = status & ~np.isnan(values)
+    if is_time_stat(stat):
+        with np.errstate(invalid="ignore"):
+            mask &= (values >= min_val) & (values <= max_val)
+    in_ids = np.isin(names, list(ids)) if ids is not None else np.ones(len(names), dtype=bool)
+    mask &= in_ids
+    if attempted is None:
+        attempted = int(in_ids.sum())
+
+    prog = Program.from_arrays(
+        preamble["program"], preamble["prog_alias"], names, values, columns, stat, attempted
+    )
+    return prog.take(mask)
+
+
+def load_json_data_from_file(
+    file_path, stat_type, max_val, min_val, ids=None, stream=False, cache=None
+) -> Program:
+    """
+    Loads the solved instances of a single json result file. stat_type is one statistic or a
+    list of them, read in one pass: the first one gives the values of the program and is
+    bounded by min_val and max_val, the others are kept as its columns.
+    With stream=True the file is parsed incrementally instead of materialising the whole document.
+    If a ResultCache is given, the parsed column of each statistic is reused when the file is unchanged.
+    """
+    stat_types = [stat_type] if isinstance(stat_type, str) else list(stat_type)
+
+    if cache is not None:
+        with stage("cache_get"):
+            entries = {stat: cache.get(file_path, stat) for stat in stat_types}
+        missing = [stat for stat, entry in entries.items() if entry is None]
+        if missing:
+            with stage("json_parse"):
+                preamble, names, columns, status, _ = _load_json_columns(file_path, missing, stream)
+                count(instances=len(names))
+            with stage("cache_put"):
+                for stat in missing:
+                    entries[stat] = (preamble, names, columns[stat], status)
+                    cache.put(file_path, stat, *entries[stat])
+        with stage("filter"):
+            # The entries of an unchanged file are aligned on the same instances
+            preamble, names, _, status = entries[stat_types[0]]
+            columns = {stat: entries[stat][2] for stat in stat_types}
+            return _program_from_columns(preamble, names, columns, status, max_val, min_val, ids)
+
+    # Instances are filtered while they are parsed
+    with stage("json_parse_filter"):
+        ids = set(ids) if ids is not None else None
+        preamble, names, columns, status, attempted = _load_json_columns(
+            file_path, stat_types, stream, solved_only=True, ids=ids
+        )
+        count(instances=len(names))
+        return _program_from_columns(preamble, names, columns, status, max_val, min_val, attempted=attempted)
+
+
+# Cell values treated as unsolved in csv tables (compared in lower case)
+CSV_MISSING_VALUES = ("", "-", "?", "na", "n/a", "nan", "none", "null", "to", "timeout", "fail", "unsolved")
+
+
+def _csv_delimiter(header: str):
+    # Tabs and commas are explicit delimiters, anything else is whitespace separated
+    for delimiter in ("\t", ",", ";"):
+        if delimiter in header:
+            return delimiter
+    return None
+
+
+def load_csv_data_from_file(file_path, max_val, min_val, ids=None) -> List[Program]:
+    """
+    Loads a wide csv/tsv table with an instance column followed by one column per program.
+    The header row names the programs. Missing values and timeouts are treated as unsolved.
+    Whitespace separated tables cannot have empty cells, as runs of whitespace are one separator.
+    Returns one Program per program column.
+    """
+    with open(file_path, "r") as f:
+        header = f.readline()
+    delimiter = _csv_delimiter(header)
+
+    # Parse the whole table in one pass as strings
+    with stage("csv_parse"):
+        try:
+            table = np.loadtxt(
+                file_path, dtype=str, delimiter=delimiter, quotechar='"', ndmin=2, comments=None
+            )
+        except ValueError as e:
+            if delimiter is not None:
+                raise
+            raise ValueError(
+                f"{file_path}: rows of whitespace separated tables need a value in every column, "
+                f"mark missing ones with - or separate the columns with tabs or commas ({e})"
+            )
+        columns = [col.strip() for col in table[0]]
+        table = np.char.strip(table[1:])
+        count(instances=len(table))
+
+    names = table[:, 0]
+    row_mask = np.ones(len(names), dtype=bool) if ids is None else np.isin(names, list(ids))
+    attempted = int(row_mask.sum())  # Missing cells are unsolved instances of the program
 
-    # Get name attributes
-    name = data["preamble"]["program"]
-    alias = data["preamble"]["prog_alias"]
+    data = []
+    with stage("filter"):
+        for col_name, col in zip(columns[1:], table[:, 1:].T):
+            missing = np.isin(np.char.lower(col), CSV_MISSING_VALUES)
+            values = np.where(missing, "nan", col).astype(np.float64)
+            with np.errstate(invalid="ignore"):
+                mask = row_mask & (values >= min_val) & (values <= max_val)
+            data += [Program.from_arrays(col_name, col_name, names[mask], values[mask], attempted=attempted)]
 
-    solved_stat = {}
-    for name, entry in data["stats"].items():
+    return data
 
-        # Check whether name is in set - if using
-        if ids is not None and name not in ids:
-            continue # Skip entry
-        # Check that it was solved
-        if entry["status"]:
-            # Get the value and check the requirements
-            value = entry[stat_type]
-            if min_val <= value <= max_val:
-                solved_stat[name] = value
 
-    return Program(name, alias, solved_stat)
+def _stream_experiment_arrays(db, exp_ids, max_val, min_val, problem_set, batch_size=10000):
+    """
+    Streams the rows of all experiments from one query and returns {exp_id: (names, runtimes)},
+    converting each batch of rows into arrays so the full result set is never held as tuples.
+    """
+    chunks = {str(exp_id): ([], []) for exp_id in exp_ids}
+    batches = db.iter_solved_problem_name_time_batches(
+        exp_ids, max_val, problem_set, min_val, batch_size=batch_size
+    )
+    for rows in batches:
+        exps = np.array([str(row[0]) for row in rows])
+        names = np.array([row[1] for row in rows], dtype=object)
+        runtimes = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+        for exp_id in np.unique(exps).tolist():
+            mask = exps == exp_id
+            chunks[exp_id][0].append(names[mask])
+            chunks[exp_id][1].append(runtimes[mask])
+
+    res = {}
+    for exp_id in exp_ids:
+        names, runtimes = chunks[str(exp_id)]
+        res[exp_id] = (
+            np.concatenate(names) if names else np.array([], dtype=object),
+            np.concatenate(runtimes) if runtimes else np.array([], dtype=np.float64),
+        )
+    return res
 
 
-def load_experiment_data_from_db(exp_id, alias, max_val, min_val, ltb, problem_set):
+def _fetch_experiments(exp_ids, max_val, min_val, ltb, problem_set, db=None, cache=None, refresh=False):
+    """
+    Returns {exp_id: (names, runtimes)} for the experiments, taking fresh entries from the
+    cache and streaming the others from one batched query over a single connection.
+    The time bounds are applied by the DB, so the returned rows may be a superset of the
+    window only if they come from an unbounded (pre-fetched) cache entry.
+    """
     from database import DB  # Importing here as it requires mysql that might  not be installed
 
-    db = DB(ltb_problems=ltb)
-    res = db.get_solved_problem_name_time(exp_id, upper_time_bound=max_val, problem_set=problem_set)
+    own_db = db is None
+    if own_db:
+        db = DB(ltb_problems=ltb)
+
+    bounds = tuple(None if val is None else float(val) for val in (max_val, min_val))
+    res = {}
+    if cache is not None and not refresh:
+        with stage("cache_get"):
+            for exp_id in exp_ids:
+                # Entries of the same bounds, or else pre-fetched unbounded ones
+                entry = cache.get(exp_id, db, problem_set, bounds)
+                if entry is None and bounds != (None, None):
+                    entry = cache.get(exp_id, db, problem_set)
+                if entry is not None:
+                    res[exp_id] = entry
+
+    missing = [exp_id for exp_id in exp_ids if exp_id not in res]
+    if missing:
+        try:
+            print("# Fetching: ", ", ".join(str(exp_id) for exp_id in missing))
+            with stage("db_query"):
+                fetched = _stream_experiment_arrays(db, missing, max_val, min_val, problem_set)
+                count(instances=sum(len(names) for names, _ in fetched.values()))
+        finally:
+            if own_db:
+                db.close()
+
+        for exp_id in missing:
+            if cache is not None:
+                cache.put(exp_id, db, problem_set, *fetched[exp_id], bounds=bounds)
+            res[exp_id] = fetched[exp_id]
+
+    return res
 
-    # Filter on lower time bound
-    res = list(filter(lambda x: x[1] >= min_val, res))
 
-    # Convert to dict
-    res = {k: v for k, v in res}
+def load_experiment_data_from_db(exp_id, alias, max_val, min_val, ltb, problem_set, db=None, cache=None):
+    return load_experiments_data_from_db({exp_id: alias}, max_val, min_val, ltb, problem_set, db, cache)[0]
 
-    return Program(exp_id, alias, res)
+
+def load_experiments_data_from_db(
+    exp_data, max_val, min_val, ltb, problem_set, db=None, cache=None
+) -> List[Program]:
+    """
+    Loads all experiments of the {exp_id: alias} spec over a single connection,
+    fetching the rows of every experiment in one batched query. With an
+    ExperimentCache, cached experiments are loaded without querying the DB.
+    """
+    print("# Loading: ", ", ".join(f"{exp_id} ({alias})" for exp_id, alias in exp_data.items()))
+    res = _fetch_experiments(list(exp_data), max_val, min_val, ltb, problem_set, db, cache)
+
+    data = []
+    for exp_id, alias in exp_data.items():
+        names, runtimes = res[exp_id]
+        # Rows of unbounded cache entries still need the time bounds
+        mask = (runtimes >= min_val) & (runtimes <= max_val)
+        data += [Program.from_arrays(exp_id, alias, names[mask], runtimes[mask], stat="rtime")]
+    return data
+
+
+def warm_experiment_cache(exp_ids, ltb, problem_set, cache, refresh=False, db=None):
+    """
+    Fetches the experiments into the cache, refetching cached ones if refresh is set.
+    """
+    _fetch_experiments(list(exp_ids), None, None, ltb, problem_set, db, cache, refresh)
 
 
 def load_ids(prob_set_file: str) -> List[str]:
@@ -87,6 +536,54 @@ def load_ids(prob_set_file: str) -> List[str]:
      return prob_set
 
 
+def _load_json_files_parallel(executor, data_paths, load_args, stream, cache) -> List[Program]:
+    with executor:
+        futures = [
+            executor.submit(load_json_data_from_file, data_path, *load_args, stream=stream, cache=cache)
+            for data_path in data_paths
+        ]
+        # Collect in the given order to keep the line styles stable
+        data = []
+        for data_path, future in zip(data_paths, futures):
+            try:
+                data += [future.result()]
+            except Exception:
+                print(f"Failed loading: {data_path}")
+                for f in futures:
+                    f.cancel()
+                raise
+            print(f"Loaded: {data_path}")
+    return data
+
+
+def load_json_files(data_paths, load_args, stream=False, jobs=1, cache=None) -> List[Program]:
+    """
+    Loads each json file into a Program, in the order given. With jobs > 1 the files
+    are decoded concurrently in a process pool (jobs=0 uses all CPUs).
+    """
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+
+    if jobs > 1 and len(data_paths) > 1:
+        try:
+            executor = ProcessPoolExecutor(max_workers=min(jobs, len(data_paths)))
+        except (OSError, NotImplementedError, ImportError) as err:
+            # Process pools are not available everywhere (e.g. restricted sandboxes)
+            print(f"# Parallel loading unavailable ({err}), loading sequentially")
+        else:
+            try:
+                return _load_json_files_parallel(executor, data_paths, load_args, stream, cache)
+            except (BrokenProcessPool, pickle.PicklingError) as err:
+                # The workers died (e.g. killed for memory) or the jobs could not be sent to them
+                print(f"# Parallel loading failed ({type(err).__name__}: {err}), loading sequentially")
+
+    data = []
+    for data_path in data_paths:
+        print(f"Loading: {data_path}")
+        data += [load_json_data_from_file(data_path, *load_args, stream=stream, cache=cache)]
+    return data
+
+
 def load_data(data_paths, args) -> List[Program]:
 
     # Compute the min value
@@ -103,10 +600,19 @@ def load_data(data_paths, args) -> List[Program]:
 
     data = []
     if args["data_type"] == "json":
+        load_args = (args["stat_type"].split(","), args["timeout"], min_val, ids)
+        if args["clear_cache"]:
+            ResultCache(args["cache_dir"]).clear()
+        # A cache entry holds every instance of the file, which would undo the memory bound of streaming
+        cache = None
+        if not args["no_cache"] and not args["json_stream"]:
+            cache = ResultCache(args["cache_dir"], args["cache_size"])
+        data = load_json_files(data_paths, load_args, args["json_stream"], args["jobs"], cache)
+
+    elif args["data_type"] == "csv":
         for data_path in data_paths:
             print(f"Loading: {data_path}")
-            file_data = load_json_data_from_file(data_path, args["stat_type"], args["timeout"], min_val, ids)
-            data += [file_data]
+            data += load_csv_data_from_file(data_path, args["timeout"], min_val, ids)
 
     elif args["data_type"] == "db":
         if args["stat_type"] != "rtime":
@@ -117,12 +623,14 @@ def load_data(data_paths, args) -> List[Program]:
             raise TypeError(
                 'Issue converting db data spec to json. The format is \'{"id1": "alias1", "id2": "alias2"}\''
             )
-        for exp_id, alias in exp_data.items():
-            print("# Loading: ", exp_id, alias)
-            exp_data = load_experiment_data_from_db(
-                exp_id, alias, args["timeout"], min_val, args["db_data_ltb"], ids
-            )
-            data += [exp_data]
+        if args["clear_cache"]:
+            ExperimentCache(args["cache_dir"]).clear()
+        cache = None
+        if not args["no_cache"]:
+            cache = ExperimentCache(args["cache_dir"], args["cache_size"], args["db_cache_ttl"])
+        data = load_experiments_data_from_db(
+            exp_data, args["timeout"], min_val, args["db_data_ltb"], ids, cache=cache
+        )
 
     else:
         raise ValueError(f"Unknown data type \"{args['data_type']}\"")
@@ -135,26 +643,56 @@ def join_data(data: List[Program]) -> List[Program]:
     """
     Takes a list of programs and returns the truncated programs based
     on their intersection of solved instances.
+
+    Instance names are mapped to integer ids once (in order of first appearance)
+    and intersected as sorted id arrays, so all returned programs are aligned on
+    the same instances in the order of the first program.
     """
     # Need at least two programs to join
     if len(data) < 2:
         return data
 
-    # Compute the intersection
-    inter = set(data[0].get_instance_names())
-    for prog in data[1:]:
-        inter = inter.intersection(prog.get_instance_names())
+    with stage("join"):
+        return _join_programs(data)
 
-    # Truncate entries
-    new_data = []
-    for prog in data:
-        # Join on the correct order
-        curr_inst = prog.get_instances()
-        new_prog = Program(
-            prog.get_name(), prog.get_alias(), {inst_name: curr_inst[inst_name] for inst_name in inter}
+
+def instance_ids(data: List[Program]):
+    """
+    Maps every instance name to an integer id in order of first appearance, with one dict
+    pass per program. Returns the name -> id dict and the id array of every program.
+    """
+    name_ids = {}
+    prog_ids = [
+        np.fromiter(
+            (name_ids.setdefault(name, len(name_ids)) for name in prog.get_instance_names().tolist()),
+            dtype=np.int64,
+            count=len(prog),
         )
-        new_data += [new_prog]
+        for prog in data
+    ]
+    return name_ids, prog_ids
 
+
+def _join_programs(data: List[Program]) -> List[Program]:
+    # Map every instance name to an integer id
+    _, prog_ids = instance_ids(data)
+
+    # Compute the intersection
+    inter = prog_ids[0]
+    for ids in prog_ids[1:]:
+        inter = np.intersect1d(inter, ids, assume_unique=True)
+
+    # Truncate entries aligned on the intersection
+    new_data = []
+    inter_names = None
+    for prog, ids in zip(data, prog_ids):
+        order = np.argsort(ids, kind="stable")
+        pos = order[np.searchsorted(ids, inter, sorter=order)]
+        if inter_names is None:
+            inter_names = prog.get_instance_names()[pos]
+        new_data += [prog.take(pos, inter_names)]
+
+    count(instances=len(inter))
     return new_data
 
 
@@ -1,12 +1,8 @@
-import matplotlib
 import numpy as np
 import argparse
 
-matplotlib.use("pdf")  # for not loading GUI modules
-
-from load_data import load_data
-from cactus import Cactus
-from scatter import Scatter
+from load_data import load_data, load_ids
+from profiling import count, session, stage
 
 
 def get_parser() -> argparse.ArgumentParser:
@@ -17,13 +13,44 @@ def get_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "--data_type",
         type=str,
-        choices=["json", "db"],
+        choices=["json", "csv", "db"],
         default="json",
-        help="Type of data to load. Json is list of json files. DB is json specification of {exp_id: alias}",
+        help="Type of data to load. Json is list of json files. Csv is list of wide tables with an instance "
+        "column and one column per program. DB is json specification of {exp_id: alias}",
     )
     parser.add_argument(
         "--db_data_ltb", action="store_true", help="Specify if the DB experiments are on LTB data"
     )
+    parser.add_argument(
+        "--json_stream",
+        action="store_true",
+        help="Parse json files incrementally to keep memory bounded on very large result files",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes used to load json files concurrently (0 uses all CPUs)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Do not use the cache of parsed json files and DB experiments"
+    )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="Remove the cached data of the given --data_type before loading",
+    )
+    parser.add_argument(
+        "--cache_dir", default=None, help="Directory of the data caches (default: ~/.cache/cactus_plot)"
+    )
+    parser.add_argument("--cache_size", type=float, default=512, help="Size bound of each cache in MB")
+    parser.add_argument(
+        "--db_cache_ttl",
+        type=float,
+        default=24,
+        help="Hours after which cached DB experiments are refetched (0 never expires)",
+    )
     parser.add_argument('--dataset', default=None,
                         help="Path to file containing ids (problem names) used to subset the data")
 
@@ -61,6 +88,15 @@ def get_parser() -> argparse.ArgumentParser:
         default="times",
         help="Font to use",
     )
+    parser.add_argument(
+        "--stats_format",
+        choices=["text", "json", "csv"],
+        default="text",
+        help="Output format of the dry run statistics",
+    )
+    parser.add_argument(
+        "--stats_out", default=None, help="Write the dry run statistics to this file instead of stdout"
+    )
     parser.add_argument("--font-sz", type=int, default=12, help="Font size to use")
     parser.add_argument("--grid_color", default="black", help="The colour of the grid")
     parser.add_argument("--grid_style", default=":", help="The grid style")
@@ -68,7 +104,13 @@ def get_parser() -> argparse.ArgumentParser:
     parser.add_argument("--no-grid", action="store_true", help="Do not show the grid")
 
     parser.add_argument(
-        "-s", "--stat_type", type=str, default="rtime", help=" Statistics value to measure (Only for json)"
+        "-s",
+        "--stat_type",
+        type=str,
+        default="rtime",
+        help="Statistics value to measure (Only for json). A comma-separated list (e.g. rtime,mempeak) "
+        "loads all of them in one pass: the first is plotted, the others are reported by --dry_run "
+        "and drawn by --panels stat",
     )
     parser.add_argument("-l", "--usetex", action="store_true", help="Use latex")
 
@@ -102,6 +144,21 @@ def get_parser() -> argparse.ArgumentParser:
         default="cactus",
         help="Plot type to produce",
     )
+    parser.add_argument(
+        "--panels",
+        choices=["pairwise", "family", "stat"],
+        default=None,
+        help="Draw several panels in one figure: a scatter of every pair of programs, "
+        "one plot of the --plot_type per instance family, or one cactus plot per --stat_type",
+    )
+    parser.add_argument(
+        "--family_regex",
+        default=r"^([^0-9]*)",
+        help="Regex whose first group (or match) is the family of an instance name",
+    )
+    parser.add_argument(
+        "--panel_cols", type=int, default=None, help="Number of panel columns of family and stat figures"
+    )
     parser.add_argument("--save-to", type=str, default="plot", help="Where result figure should be saved")
     parser.add_argument(
         "--shape",
@@ -121,8 +178,73 @@ def get_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument("--transparent", action="store_true", help="Save the file in the transparent mode")
     parser.add_argument(
-        "--vbs", type=str, default=None, help="List of VBSes"
-    )  # Format: {"vbs1": ["tool1", "tool2"], "vbs2": "all"}
+        "--vbs",
+        type=str,
+        default=None,
+        help='Virtual best solvers to add, as json {"vbs1": ["tool1", "tool2"], "vbs2": "all"} '
+        "where tools are program aliases or names",
+    )
+    parser.add_argument(
+        "--density",
+        action="store_true",
+        help="Draw scatter plots as a 2D histogram of the instances instead of one marker per instance",
+    )
+    parser.add_argument(
+        "--density_bins", type=int, default=60, help="Number of bins per axis of the scatter density plot"
+    )
+    parser.add_argument(
+        "--rasterize",
+        action="store_true",
+        help="Rasterize the cactus lines and scatter markers in vector outputs, keeping text and axes vector",
+    )
+    parser.add_argument(
+        "--raster_dpi", type=int, default=300, help="Resolution of the rasterized data layers"
+    )
+    parser.add_argument(
+        "--decimate",
+        type=float,
+        default=None,
+        help="Drop cactus points that are not visible within this tolerance in pixels (e.g. 0.5)",
+    )
+    parser.add_argument(
+        "--portfolio",
+        type=int,
+        default=None,
+        help="Select portfolios of up to this many programs solving the most instances and plot their VBS",
+    )
+    parser.add_argument(
+        "--portfolio_exact", action="store_true", help="Also search the best portfolio exhaustively (small k)"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and re-plot whenever an input file changes (json and csv inputs)",
+    )
+    parser.add_argument(
+        "--watch_interval", type=float, default=1.0, help="Seconds between checks of the input files"
+    )
+    parser.add_argument(
+        "--watch_debounce",
+        type=float,
+        default=2.0,
+        help="Seconds an input has to stay unchanged before it is reloaded",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Record the time and peak RSS of every pipeline stage and write a json report",
+    )
+    parser.add_argument(
+        "--profile_out", default="profile.json", help="File of the --profile report (default: profile.json)"
+    )
+    parser.add_argument(
+        "--profile_memory",
+        action="store_true",
+        help="Also trace the peak memory of every stage with tracemalloc, which slows down the run",
+    )
+    parser.add_argument(
+        "--profile_pstats", default=None, help="Also write cProfile statistics of the run to this file"
+    )
     parser.add_argument("--xkcd", action="store_true", help="Use xkcd-style sketch plotting")
     parser.add_argument("--seaborn", action="store_true", help="Use seaborn to plot")
 
@@ -138,6 +260,106 @@ def get_parser() -> argparse.ArgumentParser:
     return parser
 
 
+def process_data(data, args):
+    """
+    Pipeline stages applied to the loaded programs before plotting.
+    """
+    programs = data
+    if args["vbs"]:
+        from vbs import add_vbs
+
+        data = add_vbs(data, args["vbs"])
+    if args["portfolio"]:
+        from portfolio import portfolio_stage
+
+        # The portfolios are built from the loaded programs only, the VBS programs are kept after them
+        data = portfolio_stage(programs, args["portfolio"], args["portfolio_exact"]) + data[len(programs) :]
+    return data
+
+
+def print_stats(data, args, programs=None):
+    """
+    Writes the statistics of the processed programs. Only the loaded programs, if given, compete
+    for unique solves and pairwise wins, not the ones derived from them by process_data.
+    """
+    from stats import compute_stats, write_stats
+
+    nof_instances = len(set(load_ids(args["dataset"]))) if args["dataset"] is not None else None
+    competing = None if programs is None else [any(prog is p for p in programs) for prog in data]
+    stats = compute_stats(data, args["timeout"], nof_instances, args["stat_type"].split(",")[1:], competing)
+    write_stats(stats, args["stats_format"], args["stats_out"])
+
+
+def get_plotter(args):
+    # The plotting stack is only imported when a figure is rendered
+    import matplotlib
+
+    matplotlib.use("pdf")  # for not loading GUI modules
+
+    from cactus import Cactus
+    from scatter import Scatter
+
+    if args["plot_type"] == "cactus" and args["panels"] != "pairwise":
+        return Cactus(args)
+    return Scatter(args)
+
+
+def plot_data(data, args):
+    # Initialise plotting style
+    with stage("setup"):
+        plotter = get_plotter(args)
+
+    if args["panels"] == "pairwise":
+        from panels import pairwise_panels
+
+        plotter.create_panels(*pairwise_panels(data))
+        return
+
+    if args["panels"] == "stat":
+        from panels import stat_panels
+
+        if args["plot_type"] != "cactus":
+            raise ValueError("Stat panels are only supported for cactus plots")
+        plotter.create_panels(*stat_panels(data, args["stat_type"].split(","), args["panel_cols"]))
+        return
+
+    if args["plot_type"] == "scatter" and len(data) != 2:
+        raise ValueError(
+            f"Scatter plot only supports two program/experiments at a time. {len(data)} provided."
+        )
+
+    # Create the plot
+    if args["panels"] == "family":
+        from panels import family_panels
+
+        plotter.create_panels(*family_panels(data, args["family_regex"], args["panel_cols"]))
+    else:
+        plotter.create(data)
+
+
+def run(args):
+    if args["watch"]:
+        from watch import watch
+
+        watch(args)
+        return
+
+    # Load the data
+    with stage("load"):
+        programs = load_data(args["data"], args)
+        count(programs=len(programs), instances=sum(len(prog) for prog in programs))
+    with stage("process"):
+        data = process_data(programs, args)
+
+    # Check if computing stats or plotting
+    if args["dry_run"]:
+        with stage("stats"):
+            print_stats(data, args, programs)
+    else:
+        with stage("plot"):
+            plot_data(data, args)
+
+
 #
 # ==============================================================================
 def main():
@@ -146,31 +368,9 @@ def main():
     args = parser.parse_args()
     args = vars(args)  # Use dict style
 
-    # Load the data
-    data = load_data(args["data"], args)
-
-    # Check if computing stats or plotting
-    if args["dry_run"]:
-        for program in data:
-            print()
-            print(f"{program.get_alias()}:")
-            print(f"    # solved: {len(program)}")
-            print(f"    min. val: {program.get_min_val():.1f}")
-            print(f"    max. val: {program.get_max_val():.1f}")
-            print(f"    avg. val: {program.get_average_val():.1f}")
-    else:
-        # Initialise plotting style
-        if args["plot_type"] == "cactus":
-            plotter = Cactus(args)
-        else:
-            if len(data) != 2:
-                raise ValueError(
-                    f"Scatter plot only supports two program/experiments at a time. {len(data)} provided."
-                )
-            plotter = Scatter(args)
-
-        # Create the plot
-        plotter.create(data)
+    report_path = args["profile_out"] if args["profile"] else None
+    with session(report_path, args["profile_pstats"], args["profile_memory"]):
+        run(args)
 
 
 if __name__ == "__main__":
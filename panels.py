@@ -0,0 +1,90 @@
+from typing import List
+import itertools
+import math
+import re
+import numpy as np
+
+from load_data import Program
+
+# Leading non-digit part of the instance name, e.g. "ALG" for "ALG001+1.p"
+DEFAULT_FAMILY_REGEX = r"^([^0-9]*)"
+
+
+def _grid_shape(nof_panels: int, ncols=None):
+    ncols = ncols or max(1, math.ceil(math.sqrt(nof_panels)))
+    return math.ceil(nof_panels / ncols), ncols
+
+
+def instance_families(names, pattern=DEFAULT_FAMILY_REGEX) -> np.ndarray:
+    """
+    Returns the family of every instance name: the first group (or the whole match) of the
+    pattern, or "other" if it does not match.
+    """
+    regex = re.compile(pattern)
+
+    def family(name):
+        match = regex.search(str(name))
+        if match is None:
+            return "other"
+        return match.group(1) if regex.groups else match.group(0)
+
+    # Each distinct name is matched once
+    uniq, inverse = np.unique(np.asarray(names, dtype=str), return_inverse=True)
+    return np.array([family(name) for name in uniq], dtype=object)[inverse]
+
+
+def family_panels(data: List[Program], pattern=DEFAULT_FAMILY_REGEX, ncols=None):
+    """
+    Splits every program by instance family. Returns the (row, col, title, programs) panels,
+    one per family in sorted order, and the grid shape.
+    """
+    families = [instance_families(prog.get_instance_names(), pattern) for prog in data]
+    family_names = sorted(set().union(*(set(fams.tolist()) for fams in families)))
+
+    nrows, ncols = _grid_shape(len(family_names), ncols)
+    panels = []
+    for i, name in enumerate(family_names):
+        progs = [prog.take(fams == name) for prog, fams in zip(data, families)]
+        panels.append((i // ncols, i % ncols, name, progs))
+    return panels, (nrows, ncols)
+
+
+def stat_panels(data: List[Program], stat_types: List[str], ncols=None):
+    """
+    Returns one (row, col, stat, programs) panel per loaded statistic, e.g. the memory next to
+    the runtime of the same solved instances, and the grid shape. The columns are selected from
+    the loaded programs without reading the inputs again. Programs without a named statistic
+    (e.g. loaded from csv tables) hold the values of the first one, and programs without a
+    statistic are left out of its panel.
+    """
+    stat_progs = []
+    for i, stat in enumerate(stat_types):
+        progs = [prog for prog in data if prog.has_stat(stat) or (i == 0 and prog.stat is None)]
+        if len(progs) < len(data):
+            missing = [prog.get_alias() for prog in data if prog not in progs]
+            print(f"# No {stat} values for {', '.join(missing)}, left out of the {stat} panel")
+        if progs:
+            stat_progs.append((stat, [prog if prog.stat is None else prog.select(stat) for prog in progs]))
+    if not stat_progs:
+        raise ValueError(f"No programs have {', '.join(stat_types)} values")
+
+    nrows, ncols = _grid_shape(len(stat_progs), ncols or len(stat_progs))
+    panels = []
+    for i, (stat, progs) in enumerate(stat_progs):
+        panels.append((i // ncols, i % ncols, stat, progs))
+    return panels, (nrows, ncols)
+
+
+def pairwise_panels(data: List[Program]):
+    """
+    Returns one (row, col, title, [x, y]) panel per pair of programs, laid out as the lower
+    triangle of a grid so that every column shares the x program and every row the y program,
+    and the grid shape.
+    """
+    if len(data) < 2:
+        raise ValueError(f"Pairwise panels need at least two programs. {len(data)} provided.")
+
+    panels = []
+    for (i, x_prog), (j, y_prog) in itertools.combinations(enumerate(data), 2):
+        panels.append((j - 1, i, f"{x_prog.get_alias()} vs {y_prog.get_alias()}", [x_prog, y_prog]))
+    return panels, (len(data) - 1, len(data) - 1)
@@ -1,11 +1,23 @@
-import matplotlib.pyplot as plt
+import abc
+from contextlib import contextmanager
+import matplotlib
+from matplotlib.figure import Figure
 import numpy as np
 import os
+import threading
+
+from profiling import stage
+
+# rcParams are global to matplotlib, so rc-scoped rendering is serialised between threads
+_RC_LOCK = threading.RLock()
+
+# Backends whose rasterized artists are rendered at raster_dpi
+_VECTOR_BACKENDS = ("pdf", "pgf", "ps", "svg")
 
 
 #
 # ==============================================================================
-class Plot:
+class Plot(abc.ABC):
     """
     Basic plotting class.
     """
@@ -22,6 +34,7 @@ class Plot:
         self.transparent = options["transparent"]
 
         self.timeout = options["timeout"]
+        self.stat_type = options["stat_type"].split(",")[0]
         self.t_label = options["t_label"]
         self.tol_loc = options["tol_loc"]
 
@@ -48,6 +61,12 @@ class Plot:
         self.grid_style = options["grid_style"]
         self.grid_width = options["grid_width"]
         self.byname = options["by_name"]
+        self.decimate = options["decimate"]
+        self.rasterize = options["rasterize"]
+        self.raster_dpi = options["raster_dpi"]
+
+        # The artists showing the programs in the last drawn axes, used by update()
+        self.data_artists = []
 
         # where to save
         self.save_to = f"{os.path.splitext(self.save_to)[0]}.{self.backend}"
@@ -71,9 +90,6 @@ class Plot:
             self.f_props["family"] = "serif"
             self.f_props["serif"] = "Palatino"
 
-        plt.rc("text", usetex=options["usetex"])
-        plt.rc("font", **self.f_props)
-
         # figure properties
         nof_subplots = 1
         fig_width_pt = 252.0  # Get this from LaTeX using \showthe\columnwidth
@@ -87,28 +103,155 @@ class Plot:
             coeff = options["shape"][4:]
             fig_width *= 1.2 if not coeff else float(coeff)  # default coefficient is 1.2
 
-        fig_size = [fig_width * 2.5, fig_height * 2.5]
+        self.fig_size = (fig_width * 2.5, fig_height * 2.5)
 
-        params = {"backend": "pdf", "text.usetex": options["usetex"], "figure.figsize": fig_size}
+        # rc settings only applied while rendering, see rc_context()
+        self.rc_params = {"text.usetex": options["usetex"], "figure.figsize": self.fig_size}
+        self.rc_params.update({f"font.{key}": value for key, value in self.f_props.items()})
+        if self.backend == "pgf":  # PGF/TikZ
+            self.rc_params["pgf.texsystem"] = "pdflatex"
+            self.rc_params["pgf.preamble"] = "\n".join(
+                [r"\usepackage[utf8x]{inputenc}", r"\usepackage[T1]{fontenc}"]
+            )
 
-        plt.rcParams.update(params)
+        # funny mode
+        self.xkcd = options["xkcd"]
+        self.seaborn = options["seaborn"]
 
-        # choosing backend
-        if self.backend in ("pdf", "ps", "svg"):  # default is pdf
-            plt.switch_backend(self.backend)
-        elif self.backend == "pgf":  # PGF/TikZ
-            pgf_params = {
-                "pgf.texsystem": "pdflatex",
-                "pgf.preamble": [r"\usepackage[utf8x]{inputenc}", r"\usepackage[T1]{fontenc}"],
-            }
-            params.update(pgf_params)
-            plt.rcParams.update(params)
-            plt.switch_backend(self.backend)
-        elif self.backend == "png":
-            plt.switch_backend("agg")
+    @contextmanager
+    def rc_context(self):
+        """
+        Applies the rc settings of the plot for the duration of the context and restores them after.
+        """
+        with _RC_LOCK, matplotlib.rc_context(self.rc_params):
+            if self.xkcd:
+                import matplotlib.pyplot as plt
 
-        # funny mode
-        if options["xkcd"]:
-            plt.xkcd()
+                plt.xkcd()  # only sets rc parameters, restored with the context
+            if self.seaborn:
+                import seaborn as sns
 
-        self.seaborn = options["seaborn"]
+                sns.set()  # set_theme
+            yield
+
+    def figure(self, nrows=1, ncols=1):
+        """
+        Creates a figure of nrows x ncols panels, each of the configured figure size.
+        Returns the figure and the 2D array of its axes.
+
+        The figure is not registered with pyplot, so it is freed as soon as it is no longer
+        referenced and several figures can be rendered independently of each other.
+        """
+        width, height = self.fig_size
+        fig = Figure(figsize=(width * ncols, height * nrows))
+        return fig, fig.subplots(nrows, ncols, squeeze=False)
+
+    @abc.abstractmethod
+    def draw(self, ax, data):
+        """
+        Draws the data on the given axes. Returns the legend handles and labels.
+        """
+
+    def update(self, ax, data, changed) -> bool:
+        """
+        Updates the artists drawn by draw() on the axes for the programs at the changed indices
+        instead of redrawing them. Returns False if the axes have to be redrawn.
+        """
+        return False
+
+    def legend(self, target, handles, labels):
+        """
+        Adds the legend to the axes or, for multi-panel figures, to the figure.
+        """
+        if self.lgd_loc == "off" or not handles:
+            return
+
+        loc, anchor = self.lgd_loc, None
+        if isinstance(target, Figure) and isinstance(loc, tuple):
+            # A figure legend placed outside the figure by loc alone is dropped from tight saves
+            loc, anchor = "center left", (1.0, 0.5)
+
+        lg = target.legend(
+            handles,
+            labels,
+            ncol=self.lgd_ncol,
+            loc=loc,
+            bbox_to_anchor=anchor,
+            fancybox=self.lgd_fancy,
+            shadow=self.lgd_shadow if self.lgd_alpha == 1.0 else False,
+        )
+        fr = lg.get_frame()
+        fr.set_lw(1)
+        fr.set_alpha(self.lgd_alpha)
+        fr.set_edgecolor("black")
+
+    def create(self, data):
+        """
+        Does the plotting.
+        """
+        with self.rc_context():
+            with stage("draw"):
+                fig, axes = self.figure()
+                self.legend(axes[0, 0], *self.draw(axes[0, 0], data))
+            self.save(fig)
+            fig.clear()  # drop the artists right away instead of waiting for the figure to be collected
+
+    def create_panels(self, panels, shape):
+        """
+        Draws every (row, col, title, data) panel on its own axes of one figure of the given
+        (nrows, ncols) shape, so all panels are built from the same loaded data in one pass.
+        """
+        with self.rc_context():
+            with stage("draw"):
+                fig, axes = self.figure(*shape)
+
+                handles, labels = [], []
+                for row, col, title, data in panels:
+                    ax = axes[row, col]
+                    panel_handles, panel_labels = self.draw(ax, data)
+                    ax.set_title(title)
+                    if not handles:
+                        # The line styles are the same in every panel
+                        handles, labels = panel_handles, panel_labels
+
+                # Hide the axes of the unused grid positions
+                used = {(row, col) for row, col, _, _ in panels}
+                for (row, col), ax in np.ndenumerate(axes):
+                    if (row, col) not in used:
+                        ax.set_axis_off()
+
+                self.legend(fig, handles, labels)
+            self.save(fig)
+            fig.clear()
+
+    def save(self, fig):
+        """
+        Saves the figure. Rasterized data artists are rendered at raster_dpi in vector outputs.
+        """
+        kwargs = {}
+        if self.rasterize and self.backend in _VECTOR_BACKENDS:
+            kwargs["dpi"] = self.raster_dpi
+        with stage("savefig"):
+            fig.savefig(self.save_to, bbox_inches="tight", transparent=self.transparent, **kwargs)
+        print("Saved to:", self.save_to)
+
+    def save_dpi(self):
+        """
+        Returns the resolution save() renders the data artists with.
+        """
+        if self.rasterize and self.backend in _VECTOR_BACKENDS:
+            return self.raster_dpi
+        dpi = matplotlib.rcParams["savefig.dpi"]
+        if dpi == "figure":
+            dpi = matplotlib.rcParams["figure.dpi"]
+        return dpi
+
+    def size_px(self, ax):
+        """
+        Returns the (width, height) of the data area of the axes in pixels at the resolution the
+        figure is saved with.
+        """
+        dpi = self.save_dpi()
+        box = ax.get_position()  # in figure coordinates
+        width, height = ax.figure.get_size_inches()
+        return box.width * width * dpi, box.height * height * dpi
@@ -0,0 +1,118 @@
+from typing import List, Tuple
+import itertools
+import math
+import numpy as np
+
+from load_data import Program
+from vbs import compute_vbs, shared_instance_index
+
+# Number of set bits of every byte value
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+# Upper bound on the candidate subsets enumerated by the exact search, one numpy pass over the
+# packed solved sets of all solvers each
+MAX_EXACT_SUBSETS = 20000
+
+
+def runtime_matrix(programs: List[Program]) -> np.ndarray:
+    """
+    Returns the solver x instance runtime matrix over the shared instance index, inf for unsolved.
+    """
+    inst_names, inst_ids, values = shared_instance_index(programs)
+    bounds = np.cumsum([0] + [len(prog) for prog in programs])
+
+    times = np.full((len(programs), len(inst_names)), np.inf)
+    rows = np.repeat(np.arange(len(programs)), np.diff(bounds))
+    times[rows, inst_ids] = values
+    return times
+
+
+def _popcount(bits: np.ndarray) -> np.ndarray:
+    # Set bits along the last axis of a packed bitset array
+    return _POPCOUNT[bits].sum(axis=-1)
+
+
+def _total_time(times: np.ndarray) -> np.ndarray:
+    # Total runtime over the solved instances of each row
+    return np.where(np.isinf(times), 0, times).sum(axis=-1)
+
+
+def greedy_portfolio(times: np.ndarray, k: int) -> Tuple[List[int], List[int]]:
+    """
+    Greedily adds the solver solving the most instances not solved by the portfolio so far,
+    breaking ties by the total runtime of the resulting portfolio.
+    Returns the chosen solver indices and the number of solved instances after each step.
+    """
+    bits = np.packbits(np.isfinite(times), axis=1)
+    covered = np.zeros(bits.shape[1], dtype=np.uint8)
+    best_time = np.full(times.shape[1], np.inf)
+
+    chosen, coverage = [], []
+    for _ in range(min(k, len(times))):
+        gains = _popcount(bits & ~covered)
+        gains[chosen] = -1
+        cands = np.flatnonzero(gains == gains.max())
+        if len(cands) > 1:
+            cands = cands[np.argsort(_total_time(np.minimum(best_time, times[cands])), kind="stable")]
+        pick = int(cands[0])
+
+        chosen.append(pick)
+        covered |= bits[pick]
+        best_time = np.minimum(best_time, times[pick])
+        coverage.append(int(_popcount(covered)))
+
+    return chosen, coverage
+
+
+def exact_portfolio(times: np.ndarray, k: int) -> Tuple[List[int], int]:
+    """
+    Finds the subset of k solvers solving the most instances by enumerating all subsets of
+    k - 1 solvers and choosing the last solver for each of them in one vectorised pass.
+    Returns the chosen solver indices and the number of solved instances.
+    """
+    nof_solvers = len(times)
+    k = min(k, nof_solvers)
+    if math.comb(nof_solvers, k - 1) > MAX_EXACT_SUBSETS:
+        raise ValueError(f"Exact portfolio search over {nof_solvers} solvers is too large for k={k}")
+
+    bits = np.packbits(np.isfinite(times), axis=1)
+
+    best, best_count = None, -1
+    for subset in itertools.combinations(range(nof_solvers), k - 1):
+        # Only solvers after the last one of the subset, so every set is visited once
+        start = subset[-1] + 1 if subset else 0
+        if start == nof_solvers:
+            continue
+        covered = np.bitwise_or.reduce(bits[list(subset)], axis=0) if subset else np.zeros_like(bits[0])
+        gains = _popcount(bits[start:] & ~covered)
+        last = int(np.argmax(gains))
+        count = int(_popcount(covered)) + int(gains[last])
+        if count > best_count:
+            best, best_count = list(subset) + [start + last], count
+
+    return best, best_count
+
+
+def portfolio_stage(data: List[Program], k: int, exact=False) -> List[Program]:
+    """
+    Reports the best portfolios of up to k of the programs and returns the virtual best
+    solver of the greedy portfolio of each size, followed by the exact one if requested.
+    """
+    times = runtime_matrix(data)
+
+    chosen, coverage = greedy_portfolio(times, k)
+    print(f"# Greedy portfolios ({times.shape[1]} instances solved by any program):")
+    portfolios = []
+    for size in range(1, len(chosen) + 1):
+        members = [data[i] for i in chosen[:size]]
+        print(f"    k={size:<3} solved {coverage[size - 1]:>8}: {', '.join(p.get_alias() for p in members)}")
+        portfolios.append(compute_vbs(f"greedy-{size}", members))
+
+    if exact:
+        best, count = exact_portfolio(times, k)
+        members = [data[i] for i in best]
+        print("# Exact portfolio:")
+        print(f"    k={len(best):<3} solved {count:>8}: {', '.join(p.get_alias() for p in members)}")
+        portfolios.append(compute_vbs(f"exact-{len(best)}", members))
+
+    return portfolios
@@ -0,0 +1,191 @@
+"""
+Per-stage instrumentation of the loading and plotting pipeline, enabled with mkplot.py --profile.
+
+Code marks its stages with
+
+    with stage("join"):
+        ...
+        count(instances=len(inter))
+
+Stages nest (e.g. "load/json_parse"), and repeated stages with the same path are summed.
+When no profiling session is active, stage() and count() do nothing.
+
+The maximum resident set size is recorded after every stage. Tracing the peak memory of the
+stages with tracemalloc slows down allocation heavy code, so it is only done on request.
+"""
+from contextlib import contextmanager, nullcontext
+import datetime
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+# The profiler of the running session, if any
+_active = None
+_NULL_STAGE = nullcontext()
+
+
+def peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float("nan")
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def stage(name):
+    """
+    Context recording the wall time, CPU time and peak memory of a stage.
+    """
+    if _active is None:
+        return _NULL_STAGE
+    return _active.stage(name)
+
+
+def count(**counts):
+    """
+    Adds the counts (e.g. programs, instances) to the innermost running stage.
+    """
+    if _active is not None and _active.frames:
+        frame = _active.frames[-1]
+        for key, value in counts.items():
+            frame["counts"][key] = frame["counts"].get(key, 0) + int(value)
+
+
+class Profiler:
+    """
+    Records the stages of one run. With trace_memory, the peak memory of a stage is the peak
+    of the memory traced by tracemalloc (Python objects and numpy arrays) while it was running.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.frames = []
+        self.stages = {}
+        self.peak = 0
+
+    def _update_peaks(self):
+        if not self.trace_memory:
+            return
+        # The traced peak is reset at every stage boundary, so it is shared by all running stages
+        peak = tracemalloc.get_traced_memory()[1]
+        self.peak = max(self.peak, peak)
+        for frame in self.frames:
+            frame["peak"] = max(frame["peak"], peak)
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def stage(self, name):
+        self._update_peaks()
+        path = "/".join([frame["path"] for frame in self.frames[-1:]] + [name])
+        frame = {"path": path, "peak": 0, "counts": {}}
+        self.frames.append(frame)
+        # Created on entry so that stages are reported in the order they started
+        entry = self.stages.setdefault(
+            path, {"stage": path, "calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_mb": 0.0}
+        )
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            self._update_peaks()
+            self.frames.pop()
+
+            entry["calls"] += 1
+            entry["wall_s"] += wall
+            entry["cpu_s"] += cpu
+            if self.trace_memory:
+                entry["peak_mb"] = max(entry["peak_mb"], frame["peak"] / (1024 * 1024))
+            else:
+                entry["peak_mb"] = None
+            entry["max_rss_mb"] = peak_rss_mb()
+            for key, value in frame["counts"].items():
+                entry[key] = entry.get(key, 0) + value
+
+
+def _versions():
+    versions = {"python": platform.python_version()}
+    for module in ("numpy", "matplotlib"):
+        if module in sys.modules:
+            versions[module] = sys.modules[module].__version__
+    return versions
+
+
+def print_report(report):
+    # The traced peaks if memory was traced, else the maximum RSS of the process after each stage
+    traced = report["total"]["peak_mb"] is not None
+    memory = "peak_mb" if traced else "max_rss_mb"
+    print()
+    print(f"# {'stage':<32} {'calls':>6} {'wall s':>9} {'cpu s':>9} {'peak MB' if traced else 'RSS MB':>9}")
+    for entry in report["stages"]:
+        indent = "  " * entry["stage"].count("/")
+        name = indent + entry["stage"].rsplit("/", 1)[-1]
+        print(
+            f"# {name:<32} {entry['calls']:>6} {entry['wall_s']:9.3f} {entry['cpu_s']:9.3f} "
+            f"{entry.get(memory, float('nan')):9.1f}"
+        )
+    total = report["total"]
+    print(f"# {'total':<32} {'':>6} {total['wall_s']:9.3f} {total['cpu_s']:9.3f} {total[memory]:9.1f}")
+
+
+@contextmanager
+def session(report_path=None, pstats_path=None, trace_memory=False):
+    """
+    Profiles the enclosed run. Writes the json timing report to report_path and, if given,
+    the cProfile statistics to pstats_path (readable with pstats or snakeviz).
+    Does nothing if neither path is given. With trace_memory the peak memory of every stage
+    is traced with tracemalloc, at the cost of slower timings.
+    """
+    global _active
+    if report_path is None and pstats_path is None:
+        yield
+        return
+
+    started = datetime.datetime.now().isoformat(timespec="seconds")
+    own_tracing = trace_memory and not tracemalloc.is_tracing()
+    if own_tracing:
+        tracemalloc.start()
+
+    profiler = None
+    if pstats_path is not None:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    _active = Profiler(trace_memory)
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        _active._update_peaks()
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(pstats_path)
+
+        report = {
+            "started": started,
+            "argv": sys.argv,
+            "versions": _versions(),
+            "total": {
+                "wall_s": wall,
+                "cpu_s": cpu,
+                "peak_mb": _active.peak / (1024 * 1024) if trace_memory else None,
+                "max_rss_mb": peak_rss_mb(),
+            },
+            "stages": list(_active.stages.values()),
+        }
+        _active = None
+        if own_tracing:
+            tracemalloc.stop()
+
+        print_report(report)
+        if report_path is not None:
+            with open(report_path, "w") as f:
+                json.dump(report, f, indent=4)
+            print(f"Profile written to: {report_path}")
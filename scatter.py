@@ -1,7 +1,7 @@
 import json
 import math
-import matplotlib.pyplot as plt
 from matplotlib import __version__ as mpl_version
+from matplotlib import ticker
 import numpy as np
 from plot import Plot
 from load_data import join_data
@@ -54,9 +54,50 @@ class Scatter(Plot, object):
         with open(self.def_path, "r") as fp:
             self.marker_style = json.load(fp)["scatter_style"]
 
-    def create(self, data):
+        self.density = options["density"]
+        self.density_bins = options["density_bins"]
+
+    def _bin_edges(self, log, vals):
+        lo, hi = self.x_min, self.x_max
+        if log:
+            if lo <= 0:
+                # The axis starts at the smallest positive value
+                positive = vals[vals > 0]
+                lo = positive.min() if len(positive) else hi / 1e6
+            return np.logspace(np.log10(lo), np.log10(hi), self.density_bins + 1)
+        return np.linspace(lo, hi, self.density_bins + 1)
+
+    def draw_density(self, ax, xs, ys):
+        """
+        Draws the instance pairs as a 2D histogram with (log-spaced on log axes) bins.
+        The cost only depends on the number of bins, not on the number of instances.
+        """
+        from matplotlib.colors import LogNorm
+
+        x_edges = self._bin_edges(self.x_log, xs)
+        y_edges = self._bin_edges(self.y_log, ys)
+        counts, _, _ = np.histogram2d(xs, ys, bins=[x_edges, y_edges])
+        if not counts.any():
+            return
+
+        counts = np.ma.masked_equal(counts.T, 0)  # Leave empty bins transparent
+        mesh = ax.pcolormesh(
+            x_edges,
+            y_edges,
+            counts,
+            cmap=self.marker_style.get("cmap", "Reds"),
+            norm=LogNorm(vmin=0.5, vmax=max(counts.max(), 1)),  # Keep single instances visible
+            zorder=5,
+            rasterized=self.rasterize,
+        )
+        cbar = ax.figure.colorbar(mesh, ax=ax, pad=0.02)
+        cbar.ax.yaxis.set_major_formatter(ticker.LogFormatterMathtext(base=10))
+        cbar.ax.yaxis.set_minor_formatter(ticker.NullFormatter())
+        cbar.set_label("instances")
+
+    def draw(self, ax, data):
         """
-        Does the plotting.
+        Draws the instances solved by both programs on the axes.
         """
 
         # Make suer only two data points are provided
@@ -71,30 +112,25 @@ class Scatter(Plot, object):
         if len(data[0]) != len(data[1]):
             raise ScatterException("Number of instances for each competitor must be the same")
 
-        if self.seaborn:
-            import seaborn as sns
-
-            sns.set()  # set_theme
-
         step = math.ceil((self.x_max - self.x_min) / 10)
         x = np.arange(self.x_min, self.x_max + self.x_min + step, step)
 
         # "good" area
-        plt.plot(x, x, color="black", ls=":", lw=1.5, zorder=3)
-        plt.plot(x, 0.1 * x, "g:", lw=1.5, zorder=3)
-        plt.plot(x, 10 * x, "g:", lw=1.5, zorder=3)
-        plt.fill_between(x, 0.1 * x, 10 * x, facecolor="green", alpha=0.15, zorder=3)
+        ax.plot(x, x, color="black", ls=":", lw=1.5, zorder=3)
+        ax.plot(x, 0.1 * x, "g:", lw=1.5, zorder=3)
+        ax.plot(x, 10 * x, "g:", lw=1.5, zorder=3)
+        ax.fill_between(x, 0.1 * x, 10 * x, facecolor="green", alpha=0.15, zorder=3)
 
-        plt.xlim([self.x_min, self.x_max])
-        plt.ylim([self.y_min, self.y_max])
+        ax.set_xlim([self.x_min, self.x_max])
+        ax.set_ylim([self.y_min, self.y_max])
 
         # Timeout lines
         if self.tol_loc != "none":
-            plt.axvline(self.timeout, linewidth=1, color="red", ls=":", label=str(self.timeout), zorder=3)
-            plt.axhline(self.timeout, linewidth=1, color="red", ls=":", label=str(self.timeout), zorder=3)
+            ax.axvline(self.timeout, linewidth=1, color="red", ls=":", label=str(self.timeout), zorder=3)
+            ax.axhline(self.timeout, linewidth=1, color="red", ls=":", label=str(self.timeout), zorder=3)
 
             if self.tol_loc == "after":
-                plt.text(
+                ax.text(
                     2 * self.x_min,
                     self.timeout + self.x_max / 40,
                     self.t_label,
@@ -102,7 +138,7 @@ class Scatter(Plot, object):
                     verticalalignment="bottom",
                     fontsize=self.f_props["size"] * 0.8,
                 )
-                plt.text(
+                ax.text(
                     self.timeout + self.x_max / 40,
                     2 * self.x_min,
                     self.t_label,
@@ -112,7 +148,7 @@ class Scatter(Plot, object):
                     rotation=90,
                 )
             else:
-                plt.text(
+                ax.text(
                     2 * self.x_min,
                     self.timeout - self.x_max / 3.5,
                     self.t_label,
@@ -120,7 +156,7 @@ class Scatter(Plot, object):
                     verticalalignment="bottom",
                     fontsize=self.f_props["size"] * 0.8,
                 )
-                plt.text(
+                ax.text(
                     self.timeout - self.x_max / 3.5,
                     2 * self.x_min,
                     self.t_label,
@@ -131,35 +167,39 @@ class Scatter(Plot, object):
                 )
 
         # scatter
-
-        plt.scatter(
-            data[0].get_values(),
-            data[1].get_values(),
-            c=self.marker_style["color"],
-            marker=self.marker_style["marker"],
-            edgecolors=self.marker_style["edgecolor"],
-            s=self.marker_style["size"],
-            alpha=self.alpha,
-            zorder=5,
-        )
+        self.data_artists = []
+        if self.density:
+            self.draw_density(ax, data[0].get_values(), data[1].get_values())
+        else:
+            points = ax.scatter(
+                data[0].get_values(),
+                data[1].get_values(),
+                c=self.marker_style["color"],
+                marker=self.marker_style["marker"],
+                edgecolors=self.marker_style["edgecolor"],
+                s=self.marker_style["size"],
+                alpha=self.alpha,
+                zorder=5,
+                rasterized=self.rasterize,
+            )
+            self.data_artists = [points]
 
         # axes' labels
         if self.x_label:
-            plt.xlabel(self.x_label)
+            ax.set_xlabel(self.x_label)
         else:
-            plt.xlabel(data[0].get_alias())
+            ax.set_xlabel(data[0].get_alias())
 
         if self.y_label:
-            plt.ylabel(self.y_label)
+            ax.set_ylabel(self.y_label)
         else:
-            plt.ylabel(data[1].get_alias())
+            ax.set_ylabel(data[1].get_alias())
 
         # turning the grid on
         if not self.no_grid:
-            plt.grid(True, color="black", ls=":", lw=1, zorder=1)
+            ax.grid(True, color="black", ls=":", lw=1, zorder=1)
 
         # choosing logarithmic scales
-        ax = plt.gca()
         if self.x_log:
             ax.set_xscale("log")
         if self.y_log:
@@ -172,7 +212,7 @@ class Scatter(Plot, object):
             ax.set_yticklabels(ax.get_yticks(), self.f_props)
 
         # formatter
-        majorFormatter = plt.LogFormatterMathtext(base=10)
+        majorFormatter = ticker.LogFormatterMathtext(base=10)
         ax.xaxis.set_major_formatter(majorFormatter)
         ax.yaxis.set_major_formatter(majorFormatter)
 
@@ -180,4 +220,15 @@ class Scatter(Plot, object):
         for axis in ["top", "bottom", "left", "right"]:
             ax.spines[axis].set_linewidth(1)
 
-        plt.savefig(self.save_to, bbox_inches="tight", transparent=self.transparent)
+        return [], []
+
+    def update(self, ax, data, changed) -> bool:
+        """
+        Moves the markers to the instances solved by both programs. The density mesh is redrawn.
+        """
+        if not self.data_artists:
+            return False
+
+        data = join_data(data)
+        self.data_artists[0].set_offsets(np.column_stack([data[0].get_values(), data[1].get_values()]))
+        return True
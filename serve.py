@@ -0,0 +1,362 @@
+"""
+Serves figures over HTTP from a long-lived process, so the plotting stack is imported once.
+
+A request posts the mkplot.py arguments of one figure, either as a command line string or
+as a json list of arguments, and receives the rendered file:
+
+    curl --data '["-t", "1000", "examples/solver1.json", "examples/solver2.json"]' \\
+        http://127.0.0.1:8765/plot -o cactus.png
+
+Input paths are relative to the --root directory of the service and may not leave it. Only
+the plotting and statistics options of mkplot.py are accepted, not the ones naming cache
+directories, line style definitions or output files. Loaded programs are kept in an LRU cache
+keyed by the fingerprint (path, mtime, size) of the files read for a request and the loading
+options, and rendered files in an LRU cache keyed by the normalised options.
+
+Figures are rendered in a process pool, so a figure cache miss pickles the loaded programs to
+a worker, which costs about as much as copying their arrays once.
+"""
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import contextlib
+import io
+import json
+import os
+import shlex
+import tempfile
+import threading
+import time
+
+from batch import _load_key
+from load_data import load_data
+
+CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "pgf": "text/plain",
+    "png": "image/png",
+    "ps": "application/postscript",
+    "svg": "image/svg+xml",
+}
+STATS_CONTENT_TYPES = {"text": "text/plain", "json": "application/json", "csv": "text/csv"}
+
+# The mkplot options a request may set, the others (caches, line style definitions, output files,
+# profiling, watch mode and loading processes) read or write files or resources of the service
+REQUEST_OPTIONS = {
+    "data",
+    "data_type",
+    "db_data_ltb",
+    "json_stream",
+    "no_cache",
+    "dataset",
+    "alpha",
+    "backend",
+    "dry_run",
+    "font",
+    "stats_format",
+    "font_sz",
+    "grid_color",
+    "grid_style",
+    "grid_width",
+    "no_grid",
+    "stat_type",
+    "usetex",
+    "lgd_alpha",
+    "legend",
+    "lgd_fancy",
+    "lgd_shadow",
+    "lgd_loc",
+    "lgd_ncol",
+    "by_name",
+    "plot_type",
+    "panels",
+    "family_regex",
+    "panel_cols",
+    "shape",
+    "timeout",
+    "t_label",
+    "tol_loc",
+    "transparent",
+    "vbs",
+    "density",
+    "density_bins",
+    "rasterize",
+    "raster_dpi",
+    "decimate",
+    "portfolio",
+    "portfolio_exact",
+    "xkcd",
+    "seaborn",
+    "x_label",
+    "x_log",
+    "x_max",
+    "x_min",
+    "y_label",
+    "y_log",
+    "y_max",
+    "y_min",
+}
+
+
+class RequestError(Exception):
+    pass
+
+
+class LruCache:
+    """
+    Least recently used cache bounded by the total size of its values.
+    """
+
+    def __init__(self, max_size, sizeof=lambda value: 1):
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.sizeof(self.entries.pop(key))
+            self.entries[key] = value
+            self.size += self.sizeof(value)
+            # The newest entry is kept even if it exceeds the bound on its own
+            while self.size > self.max_size and len(self.entries) > 1:
+                _, old = self.entries.popitem(last=False)
+                self.size -= self.sizeof(old)
+
+
+def _init_worker():
+    # Set up the plotting stack once per worker
+    import matplotlib
+
+    matplotlib.use("pdf")  # for not loading GUI modules
+    import cactus  # noqa: F401
+    import scatter  # noqa: F401
+    import stats  # noqa: F401
+
+
+def _render(args, data):
+    """
+    Renders the figure, or the statistics of a dry run, and returns the file contents.
+    """
+    from mkplot import plot_data, print_stats, process_data
+
+    # A worker process renders one request at a time, so swapping its stdout is safe
+    with tempfile.TemporaryDirectory() as tmp_dir, contextlib.redirect_stdout(io.StringIO()):
+        programs, data = data, process_data(data, args)
+        if args["dry_run"]:
+            out_path = args["stats_out"] = os.path.join(tmp_dir, "stats")
+            print_stats(data, args, programs)
+        else:
+            out_path = os.path.join(tmp_dir, f"plot.{args['backend']}")
+            args["save_to"] = out_path
+            plot_data(data, args)
+        with open(out_path, "rb") as f:
+            return f.read()
+
+
+def _file_fingerprint(path):
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        raise RequestError(str(e))
+    return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+
+def _input_fingerprint(args):
+    # The input files (or experiment ids), the --dataset file and the line style definitions
+    paths = [] if args["data_type"] == "db" else list(args["data"])
+    if args["dataset"] is not None:
+        paths.append(args["dataset"])
+    paths.append(args["def_path"])
+    fingerprint = tuple(_file_fingerprint(path) for path in paths)
+    if args["data_type"] == "db":
+        fingerprint = tuple(args["data"]) + fingerprint
+    return fingerprint
+
+
+class PlotService:
+    """
+    Answers plot requests from the data and figure caches or by rendering in the worker pool.
+    """
+
+    def __init__(self, processes=1, data_cache_entries=32, figure_cache_mb=256, root="."):
+        from mkplot import get_parser
+
+        self.root = os.path.realpath(root)
+        self.parser = get_parser()
+        self.option_names = {
+            action.dest: action.option_strings[-1] for action in self.parser._actions if action.option_strings
+        }
+
+        # Report invalid options to the client instead of exiting
+        def error(message):
+            raise RequestError(message)
+
+        self.parser.error = error
+
+        self.data_cache = LruCache(data_cache_entries)
+        # load_data reports its progress on stdout, which is swapped for the whole process while
+        # loading, so the loads of concurrent requests run one at a time
+        self.load_lock = threading.Lock()
+        self.figure_cache = LruCache(figure_cache_mb * 1024 * 1024, sizeof=lambda value: len(value[0]))
+        self.executor = ProcessPoolExecutor(processes, initializer=_init_worker)
+        # Start the workers now instead of on the first requests
+        list(self.executor.map(int, range(processes)))
+
+    def close(self):
+        self.executor.shutdown()
+
+    def parse(self, job):
+        if isinstance(job, str):
+            job = shlex.split(job)
+        if not isinstance(job, list) or not all(isinstance(arg, str) for arg in job):
+            raise RequestError("The request is a command line string or a json list of arguments")
+        try:
+            args = vars(self.parser.parse_args(job))
+        except SystemExit:
+            # --help and similar actions exit the parser
+            raise RequestError("Invalid mkplot options")
+        for dest, value in args.items():
+            if dest not in REQUEST_OPTIONS and value != self.parser.get_default(dest):
+                raise RequestError(f"{self.option_names[dest]} is not supported by the service")
+
+        if args["data_type"] != "db":
+            args["data"] = [self.resolve(path) for path in args["data"]]
+        if args["dataset"] is not None:
+            args["dataset"] = self.resolve(args["dataset"])
+        return args
+
+    def resolve(self, path):
+        """
+        Returns the real path of an input path relative to the root, which it may not leave.
+        """
+        full = os.path.realpath(os.path.join(self.root, path))
+        if os.path.commonpath([full, self.root]) != self.root:
+            raise RequestError(f"{path} is outside of the served directory")
+        return full
+
+    def handle(self, job):
+        """
+        Returns the rendered file, its content type and whether it came from the figure cache.
+        """
+        args = self.parse(job)
+        fingerprint = _input_fingerprint(args)
+
+        # The output path does not change the figure
+        options = {key: value for key, value in args.items() if key not in ("save_to", "stats_out")}
+        figure_key = (repr(sorted(options.items())), fingerprint)
+        if args["dry_run"]:
+            content_type = STATS_CONTENT_TYPES[args["stats_format"]]
+        else:
+            content_type = CONTENT_TYPES[args["backend"]]
+
+        cached = self.figure_cache.get(figure_key)
+        if cached is not None:
+            return cached[0], content_type, True
+
+        data_key = (_load_key(args), fingerprint)
+        data = self.data_cache.get(data_key)
+        if data is None:
+            with self.load_lock:
+                data = self.data_cache.get(data_key)  # loaded by a concurrent request meanwhile
+                if data is None:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        data = load_data(args["data"], args)
+                    self.data_cache.put(data_key, data)
+
+        payload = self.executor.submit(_render, args, data).result()
+        self.figure_cache.put(figure_key, (payload,))
+        return payload, content_type, False
+
+
+class PlotRequestHandler(BaseHTTPRequestHandler):
+    def _reply(self, status, payload, content_type, headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in headers:
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._reply(404, b"Not found\n", "text/plain")
+            return
+        service = self.server.service
+        health = {
+            "data_cache_entries": len(service.data_cache.entries),
+            "figure_cache_entries": len(service.figure_cache.entries),
+            "figure_cache_mb": service.figure_cache.size / (1024 * 1024),
+        }
+        self._reply(200, json.dumps(health).encode(), "application/json")
+
+    def do_POST(self):
+        if self.path != "/plot":
+            self._reply(404, b"Not found\n", "text/plain")
+            return
+
+        start = time.perf_counter()
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+        try:
+            job = json.loads(body)
+        except json.JSONDecodeError:
+            job = body  # a plain command line
+
+        try:
+            payload, content_type, hit = self.server.service.handle(job)
+        except (RequestError, OSError, ValueError, TypeError) as e:
+            self._reply(400, f"{e}\n".encode(), "text/plain")
+            return
+        except Exception as e:
+            self._reply(500, f"{type(e).__name__}: {e}\n".encode(), "text/plain")
+            return
+
+        headers = [("X-Cache", "hit" if hit else "miss"), ("X-Seconds", f"{time.perf_counter() - start:.4f}")]
+        self._reply(200, payload, content_type, headers)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Serve mkplot.py figures over HTTP from a long-lived process",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--root", default=".", help="Directory the input paths of requests are confined to")
+    parser.add_argument("-j", "--processes", type=int, default=2, help="Number of render processes")
+    parser.add_argument("--data_cache", type=int, default=32, help="Number of loaded input sets to keep")
+    parser.add_argument(
+        "--figure_cache", type=float, default=256, help="Size bound of the cached rendered files in MB"
+    )
+    return parser
+
+
+def main():
+    args = vars(get_parser().parse_args())
+
+    service = PlotService(args["processes"], args["data_cache"], args["figure_cache"], args["root"])
+    server = ThreadingHTTPServer((args["host"], args["port"]), PlotRequestHandler)
+    server.service = service
+    print(f"Serving on http://{args['host']}:{args['port']}/plot")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+from typing import List
+import csv
+import io
+import json
+import math
+import warnings
+import numpy as np
+
+from load_data import Program
+from portfolio import runtime_matrix
+
+PERCENTILES = (10, 25, 75, 90)
+PAR_FACTORS = (2, 10)
+
+
+def _clean(value):
+    # Json/csv friendly scalars: NaN and inf become None
+    value = float(value)
+    return None if math.isnan(value) or math.isinf(value) else value
+
+
+def _column_summary(prog: Program, stat) -> dict:
+    # Summary of another loaded statistic (e.g. mempeak) over the solved instances of the program,
+    # empty for programs without it (e.g. loaded from csv tables)
+    values = prog.select(stat).get_values() if prog.has_stat(stat) else np.array([])
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {f"{stat}_avg": None, f"{stat}_median": None, f"{stat}_max": None}
+    return {
+        f"{stat}_avg": _clean(values.mean()),
+        f"{stat}_median": _clean(np.median(values)),
+        f"{stat}_max": _clean(values.max()),
+    }
+
+
+def compute_stats(data: List[Program], timeout, nof_instances=None, columns=(), competing=None) -> dict:
+    """
+    Computes the statistics of all programs over the solver x instance runtime matrix.
+
+    PAR-k scores count unsolved instances as k * timeout. Unless nof_instances (e.g. the size
+    of the --dataset) gives the total, the instances are those the programs were run on if
+    their inputs list them (e.g. json results), or else those solved by any program.
+    Unique solves and the pairwise comparison are over the competing programs (a mask of data,
+    all by default), so programs derived from the others (e.g. a VBS) can be left out of them.
+    The per-program statistics cost O(solvers x instances); the pairwise comparison is done
+    per program against all others at once. The other loaded statistics given in columns
+    are summarised per program as their average, median and maximum.
+    """
+    times = runtime_matrix(data) if data else np.empty((0, 0))
+    solved = np.isfinite(times)
+    nof_solved = solved.sum(axis=1)
+    if nof_instances is None:
+        attempted = [prog.attempted for prog in data if prog.attempted is not None]
+        nof_instances = max([times.shape[1]] + attempted)
+    competing = np.ones(len(data), dtype=bool) if competing is None else np.asarray(competing, dtype=bool)
+
+    mins = np.where(solved, times, np.inf).min(axis=1, initial=np.inf)
+    maxs = np.where(solved, times, -np.inf).max(axis=1, initial=-np.inf)
+    totals = np.where(solved, times, 0).sum(axis=1)
+    means = totals / np.maximum(nof_solved, 1)
+    if times.shape[1]:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)  # Programs without solved instances
+            quantiles = np.nanpercentile(np.where(solved, times, np.nan), (50,) + PERCENTILES, axis=1)
+    else:
+        quantiles = np.full((1 + len(PERCENTILES), len(times)), np.nan)
+
+    # Instances solved by exactly one competing program
+    unique = (solved & (solved[competing].sum(axis=0) == 1)).sum(axis=1)
+
+    programs = []
+    for i, prog in enumerate(data):
+        entry = {
+            "alias": prog.get_alias(),
+            "name": str(prog.get_name()),
+            "solved": int(nof_solved[i]),
+            "unique": int(unique[i]) if competing[i] else None,
+            "min": _clean(mins[i]),
+            "max": _clean(maxs[i]),
+            "avg": _clean(means[i]) if nof_solved[i] else None,
+            "median": _clean(quantiles[0, i]),
+        }
+        for p, q in zip(PERCENTILES, quantiles[1:, i]):
+            entry[f"p{p}"] = _clean(q)
+        for k in PAR_FACTORS:
+            unsolved = nof_instances - nof_solved[i]
+            penalty = k * timeout * unsolved if unsolved else 0.0  # no inf * 0 without a timeout
+            par = (totals[i] + penalty) / nof_instances if nof_instances else math.nan
+            entry[f"par{k}"] = _clean(par)
+        for stat in columns:
+            entry.update(_column_summary(prog, stat))
+        programs.append(entry)
+
+    # Pairwise: an instance is won if solved faster than the other program or solved only by this one
+    pairwise = []
+    for i, prog in enumerate(data):
+        if not competing[i]:
+            continue
+        wins = (times[i] < times).sum(axis=1)
+        for j, other in enumerate(data):
+            if i == j or not competing[j]:
+                continue
+            pairwise.append(
+                {
+                    "alias": prog.get_alias(),
+                    "other": other.get_alias(),
+                    "wins": int(wins[j]),
+                    "losses": int((times[j] < times[i]).sum()),
+                    "solved_delta": int(nof_solved[i] - nof_solved[j]),
+                }
+            )
+
+    return {
+        "timeout": _clean(timeout),
+        "instances": int(nof_instances),
+        "columns": list(columns),
+        "programs": programs,
+        "pairwise": pairwise,
+    }
+
+
+def _csv_table(rows) -> str:
+    if not rows:
+        return ""
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue()
+
+
+def format_text(stats: dict) -> str:
+    def fmt(value):
+        return "-" if value is None else f"{value:.1f}"
+
+    lines = []
+    for entry in stats["programs"]:
+        lines += [
+            "",
+            f"{entry['alias']}:",
+            f"    # solved: {entry['solved']}",
+            f"    # unique: {'-' if entry['unique'] is None else entry['unique']}",
+            f"    min. val: {fmt(entry['min'])}",
+            f"    max. val: {fmt(entry['max'])}",
+            f"    avg. val: {fmt(entry['avg'])}",
+            f"    median:   {fmt(entry['median'])}",
+        ]
+        lines += [f"    PAR-{k}:{' ' * (5 - len(str(k)))}{fmt(entry[f'par{k}'])}" for k in PAR_FACTORS]
+        for stat in stats["columns"]:
+            lines += [
+                f"    {stat}: avg. {fmt(entry[f'{stat}_avg'])}, median {fmt(entry[f'{stat}_median'])}, "
+                f"max. {fmt(entry[f'{stat}_max'])}"
+            ]
+    return "\n".join(lines)
+
+
+def write_stats(stats: dict, fmt="text", out_path=None):
+    """
+    Writes the statistics as text, json or csv to out_path, or to stdout if not given.
+    Csv writes the pairwise table after the program table, or to <out_path>_pairwise.csv.
+    """
+    if fmt == "json":
+        outputs = [(out_path, json.dumps(stats, indent=4))]
+    elif fmt == "csv":
+        programs, pairwise = _csv_table(stats["programs"]), _csv_table(stats["pairwise"])
+        if out_path is None:
+            outputs = [(None, programs + "\n" + pairwise)]
+        else:
+            stem = out_path[:-4] if out_path.endswith(".csv") else out_path
+            outputs = [(out_path, programs), (f"{stem}_pairwise.csv", pairwise)]
+    else:
+        outputs = [(out_path, format_text(stats))]
+
+    for path, text in outputs:
+        if path is None:
+            print(text)
+        else:
+            with open(path, "w") as f:
+                f.write(text)
@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+
+from cache import NpzCache, ResultCache
+
+PREAMBLE = {"program": "solver", "prog_alias": "s"}
+
+
+def put(cache, path, stat="rtime"):
+    names, values, status = np.array(["i1", "i2"]), np.array([1.0, 2.0]), np.array([True, False])
+    cache.put(str(path), stat, PREAMBLE, names, values, status)
+
+
+def test_entries_are_reused_until_the_file_changes(tmp_path):
+    path = tmp_path / "solver.json"
+    path.write_text("{}")
+    cache = ResultCache(str(tmp_path / "cache"))
+    put(cache, path)
+
+    preamble, names, values, status = cache.get(str(path), "rtime")
+    assert preamble == PREAMBLE
+    assert names.tolist() == ["i1", "i2"]
+    assert values.tolist() == [1.0, 2.0]
+    assert status.tolist() == [True, False]
+    assert cache.get(str(path), "mempeak") is None
+
+    # A new modification time misses the cache
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cache.get(str(path), "rtime") is None
+
+    # So does a new size with the same modification time
+    put(cache, path)
+    st = os.stat(path)
+    path.write_text("{ }")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert cache.get(str(path), "rtime") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = NpzCache(str(tmp_path), max_size_mb=1)
+    block = np.zeros(40 * 1024)  # 320 KiB per entry
+    for i, key in enumerate("abc"):
+        cache._write(key, values=block)
+        os.utime(cache._entry_path(key), (i, i))  # distinct ages regardless of the timer resolution
+    assert all(os.path.exists(cache._entry_path(key)) for key in "abc")
+
+    # Reading "a" makes "b" the least recently used entry
+    cache._read("a")
+    cache._write("d", values=block)
+    assert [key for key in "abcd" if os.path.exists(cache._entry_path(key))] == ["a", "c", "d"]
+
+
+def test_unwritable_cache_does_not_fail_the_run(tmp_path, capsys):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    path = tmp_path / "solver.json"
+    path.write_text("{}")
+
+    cache = ResultCache(str(blocker / "cache"))
+    put(cache, path)
+    put(cache, path)
+    assert cache.get(str(path), "rtime") is None
+    assert capsys.readouterr().out.count("Cannot write to the cache") == 1
@@ -0,0 +1,109 @@
+import os
+
+import matplotlib
+import numpy as np
+import pytest
+
+matplotlib.use("pdf")
+
+from cactus import Cactus, decimate_curve  # noqa: E402
+from load_data import Program  # noqa: E402
+from mkplot import get_parser  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def to_px(vals, lim, log, px):
+    lo, hi = lim
+    if log:
+        vals, lo, hi = np.log10(vals), np.log10(lo), np.log10(hi)
+    return (vals - lo) / (hi - lo) * px
+
+
+def max_deviation(xs, ys, kept_xs, kept_ys, x_lim, y_lim, log, size_px):
+    # Vertical distance in pixels between the points and the line through the kept points
+    px, py = to_px(xs, x_lim, log, size_px[0]), to_px(ys, y_lim, log, size_px[1])
+    kx, ky = to_px(kept_xs, x_lim, log, size_px[0]), to_px(kept_ys, y_lim, log, size_px[1])
+    return np.abs(np.interp(px, kx, ky) - py).max()
+
+
+@pytest.fixture
+def curve():
+    rng = np.random.default_rng(0)
+    ys = np.sort(rng.lognormal(0, 2, 200000))
+    return np.arange(1, len(ys) + 1), ys
+
+
+@pytest.mark.parametrize("tol", [0.25, 1.0])
+def test_decimation_stays_within_the_tolerance(curve, tol):
+    xs, ys = curve
+    x_lim, y_lim, size_px = (0, len(xs)), (0, ys.max()), (800, 500)
+    kept_xs, kept_ys = decimate_curve(xs, ys, x_lim, y_lim, False, False, size_px, tol)
+
+    assert len(kept_xs) < len(xs) / 10
+    assert (kept_xs[0], kept_xs[-1]) == (xs[0], xs[-1])
+    assert max_deviation(xs, ys, kept_xs, kept_ys, x_lim, y_lim, False, size_px) <= tol + 1e-9
+
+
+def test_log_decimation_uses_the_smallest_positive_value(curve):
+    xs, ys = curve
+    size_px, tol = (800, 500), 0.5
+    kept_xs, kept_ys = decimate_curve(xs, ys, (0, len(xs)), (0, ys.max()), True, True, size_px, tol)
+
+    # The axes end at the smallest values instead of the non-positive limits
+    x_lim, y_lim = (xs[0], len(xs)), (ys[0], ys.max())
+    assert len(kept_xs) < len(xs) / 10
+    assert max_deviation(xs, ys, kept_xs, kept_ys, x_lim, y_lim, True, size_px) <= tol + 1e-9
+
+
+def test_short_curves_are_kept():
+    xs, ys = np.array([1, 2]), np.array([3.0, 4.0])
+    assert decimate_curve(xs, ys, (0, 2), (0, 4), False, False, (100, 100), 1.0) == (xs, ys)
+
+
+def plotter(*options):
+    args = ["-t", "1000", "--def_path", os.path.join(HERE, "defaults.json"), *options, "in.json"]
+    return Cactus(vars(get_parser().parse_args(args)))
+
+
+@pytest.mark.parametrize("backend, scale", [("pdf", 3.0), ("png", 1.0)])
+def test_size_px_uses_the_resolution_of_the_saved_data(backend, scale):
+    plain = plotter("-b", backend)
+    raster = plotter("-b", backend, "--rasterize", "--raster_dpi", str(int(3 * plain.save_dpi())))
+    with plain.rc_context():
+        _, axes = plain.figure()
+        width, height = plain.size_px(axes[0, 0])
+        raster_width, raster_height = raster.size_px(axes[0, 0])
+
+    # Rasterized data is only rendered at raster_dpi in vector outputs
+    assert raster_width == pytest.approx(scale * width)
+    assert raster_height == pytest.approx(scale * height)
+    # The data area is smaller than the figure
+    fig_width, fig_height = plain.fig_size
+    assert width < fig_width * plain.save_dpi() and height < fig_height * plain.save_dpi()
+
+
+def test_update_follows_the_values_of_other_statistics(monkeypatch):
+    names = np.array([f"i{i}" for i in range(1000)])
+    mem = np.linspace(1, 100, 1000)
+    data = [Program.from_arrays(name, name, names, mem, stat="mempeak") for name in "ab"]
+    cactus = plotter("--decimate", "1")
+    with cactus.rc_context():
+        _, axes = cactus.figure()
+        ax = axes[0, 0]
+        cactus.draw(ax, data)
+        assert ax.get_ylim()[1] == 100
+
+        lines, line = [], cactus._line
+
+        def spy(ax, prog, *lim):
+            lines.append(prog.get_name())
+            return line(ax, prog, *lim)
+
+        monkeypatch.setattr(cactus, "_line", spy)
+        data[1] = Program.from_arrays("b", "b", names, 5 * mem, stat="mempeak")
+        assert cactus.update(ax, data, [1])
+        assert ax.get_ylim()[1] == 500
+        assert cactus.data_artists[1].get_ydata()[-1] == 500
+        # The decimation of the unchanged line depends on the new limit as well
+        assert lines == ["a", "b"]
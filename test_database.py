@@ -0,0 +1,182 @@
+import sqlite3
+
+import pytest
+
+from database import DB, LIBRARY_VERSION
+
+# SZSStatus ids: 1 unsatisfiable (solved), 2 satisfiable (solved), 3 unknown (unsolved)
+PROBLEMS = ["PROB1", "PROB2", "PROB3", "PROB4"]
+RUNS = [
+    # (Experiment, Problem, Runtime, Status)
+    (1, 1, 10.0, 1),
+    (1, 2, 20.0, 1),
+    (1, 3, 30.0, 3),  # unsolved
+    (1, 4, 40.0, 2),  # incorrect: the problem is unsatisfiable
+    (2, 1, 5.0, 1),
+    (2, 2, 500.0, 1),
+    (2, 3, 15.0, 1),
+    (3, 1, 1.0, 1),  # not queried
+]
+
+
+class RecordingConnection:
+    """
+    Wraps a sqlite3 connection to record the fetchmany calls of its cursors.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.fetchmany_sizes = []
+
+    def cursor(self):
+        return RecordingCursor(self, self.conn.cursor())
+
+    def close(self):
+        self.conn.close()
+
+
+class RecordingCursor:
+    def __init__(self, owner, curs):
+        self.owner = owner
+        self.curs = curs
+
+    def __getattr__(self, name):
+        return getattr(self.curs, name)
+
+    def fetchmany(self, size):
+        rows = self.curs.fetchmany(size)
+        self.owner.fetchmany_sizes.append((size, len(rows)))
+        return rows
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(
+        """
+        CREATE TABLE Problem (ProblemID INTEGER PRIMARY KEY, ProblemName VARCHAR(255));
+        CREATE TABLE ProblemVersion (
+            ProblemVersionID INTEGER PRIMARY KEY, Problem INT, Version INT, Status INT
+        );
+        CREATE TABLE SZSStatus (SZSStatusID INTEGER PRIMARY KEY, Solved INT, Sat INT, Unsat INT);
+        CREATE TABLE ProblemRun (
+            Experiment INT, Problem INT, Runtime REAL, Status INT, SZS_Status VARCHAR(32)
+        );
+        INSERT INTO SZSStatus VALUES (1, 1, 0, 1), (2, 1, 1, 0), (3, 0, 0, 0);
+        """
+    )
+    conn.executemany("INSERT INTO Problem VALUES (?, ?)", enumerate(PROBLEMS, 1))
+    # All problems are unsatisfiable in the library version
+    conn.executemany(
+        "INSERT INTO ProblemVersion VALUES (?, ?, ?, 1)", ((i, i, LIBRARY_VERSION) for i in range(1, 5))
+    )
+    conn.executemany("INSERT INTO ProblemRun VALUES (?, ?, ?, ?, 'Theorem')", RUNS)
+    return RecordingConnection(conn)
+
+
+def make_db(conn, **kwargs):
+    return DB(connect=lambda: conn, placeholder="?", **kwargs)
+
+
+def test_batch_query_splits_rows_per_experiment(conn):
+    with make_db(conn) as db:
+        res = db.get_solved_problem_name_time_batch([1, 2])
+
+    assert {exp_id: sorted(rows) for exp_id, rows in res.items()} == {
+        "1": [("PROB1", 10.0), ("PROB2", 20.0)],
+        "2": [("PROB1", 5.0), ("PROB2", 500.0), ("PROB3", 15.0)],
+    }
+
+
+def test_time_bounds_are_applied_in_the_query(conn):
+    with make_db(conn) as db:
+        res = db.get_solved_problem_name_time_batch([1, 2], upper_time_bound=100, lower_time_bound=10)
+
+    assert sorted(res["1"]) == [("PROB1", 10.0), ("PROB2", 20.0)]
+    assert sorted(res["2"]) == [("PROB3", 15.0)]
+
+
+def test_problem_set_joins_the_temporary_table(conn):
+    with make_db(conn) as db:
+        res = db.get_solved_problem_name_time_batch([2], problem_set=["PROB3", "PROB1", "PROB3"])
+        assert sorted(res["2"]) == [("PROB1", 5.0), ("PROB3", 15.0)]
+        assert db.loaded_problem_set == ("PROB3", "PROB1", "PROB3")
+
+        # A new problem set replaces the contents of the table on the same connection
+        res = db.get_solved_problem_name_time_batch([2], problem_set=["PROB2"])
+        assert res["2"] == [("PROB2", 500.0)]
+
+        names = [row[0] for row in conn.conn.execute("SELECT ProblemName FROM ProblemSet")]
+        assert names == ["PROB2"]
+
+
+def test_rows_are_streamed_in_batches(conn):
+    with make_db(conn) as db:
+        batches = list(db.iter_solved_problem_name_time_batches([1, 2], batch_size=2))
+
+    assert [len(rows) for rows in batches] == [2, 2, 1]
+    assert sorted(row for rows in batches for row in rows) == [
+        (1, "PROB1", 10.0),
+        (1, "PROB2", 20.0),
+        (2, "PROB1", 5.0),
+        (2, "PROB2", 500.0),
+        (2, "PROB3", 15.0),
+    ]
+    # The last call returns no rows and ends the stream
+    assert conn.fetchmany_sizes == [(2, 2), (2, 2), (2, 1), (2, 0)]
+
+
+def test_connection_is_reused_until_closed(conn):
+    opened = []
+
+    def connect():
+        opened.append(conn)
+        return conn
+
+    db = DB(connect=connect, placeholder="?")
+    db.get_solved_problem_name_time_batch([1])
+    db.get_solved_problem_name_time_batch([2], problem_set=["PROB1"])
+    assert len(opened) == 1
+    db.close()
+    assert db.conn is None and db.loaded_problem_set is None
+
+
+def test_cached_experiments_keep_the_time_bounds(conn, tmp_path):
+    from cache import ExperimentCache
+    from load_data import load_experiments_data_from_db, warm_experiment_cache
+
+    cache = ExperimentCache(str(tmp_path))
+    with make_db(conn) as db:
+        queries = []
+        conn.conn.set_trace_callback(queries.append)
+        (prog,) = load_experiments_data_from_db({2: "exp2"}, 100, 10, False, None, db, cache)
+        assert sorted(prog.get_instance_names().tolist()) == ["PROB3"]
+        # The bounds reach the DB and the entry only holds the rows within them
+        assert any("PR.Runtime <= 100.0" in q and "PR.Runtime >= 10.0" in q for q in queries)
+        assert cache.get(2, db, None, (100.0, 10.0))[0].tolist() == ["PROB3"]
+        assert cache.get(2, db, None) is None
+
+        # Same bounds: served from the cache
+        queries.clear()
+        load_experiments_data_from_db({2: "exp2"}, 100, 10, False, None, db, cache)
+        assert not any("ProblemRun" in q for q in queries)
+
+        # Pre-fetched unbounded entries serve any bounds
+        warm_experiment_cache([1], False, None, cache, db=db)
+        queries.clear()
+        (prog,) = load_experiments_data_from_db({1: "exp1"}, 15, 0, False, None, db, cache)
+        assert prog.get_instance_names().tolist() == ["PROB1"]
+        assert not any("ProblemRun" in q for q in queries)
+
+
+def test_unwritable_experiment_cache_keeps_the_fetched_rows(conn, tmp_path, capsys):
+    from cache import ExperimentCache
+    from load_data import load_experiments_data_from_db
+
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache = ExperimentCache(str(blocker))
+    with make_db(conn) as db:
+        (prog,) = load_experiments_data_from_db({1: "exp1"}, 100, 0, False, None, db, cache)
+    assert sorted(prog.get_instance_names().tolist()) == ["PROB1", "PROB2"]
+    assert "Cannot write to the cache" in capsys.readouterr().out
@@ -0,0 +1,8 @@
+# Renders 1000 figures in one process and fails if memory or the matplotlib state grows
+python3 benchmark.py render_leak --figures 1000
+
+if [ $? -ne 0 ]; then
+    echo "ERROR"
+    exit 1
+fi
+# Passing without issues
@@ -0,0 +1,172 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+from load_data import Program, _JsonStream, join_data, load_csv_data_from_file, load_json_data_from_file
+
+DOCUMENT = {
+    "preamble": {"program": "solver", "prog_alias": "s"},
+    "stats": {
+        'inst "quoted"\\1': {"status": True, "rtime": 12.5, "mempeak": "1024 KiB"},
+        "insté2\n": {"status": False, "rtime": 1000.0},
+        "inst3": {"status": True, "rtime": 123456789, "note": "a}b,c"},
+    },
+    "trailer": [1, [2, {"x": None}], "]"],
+}
+
+
+def read_stream(text, chunk_size):
+    reader = _JsonStream(io.StringIO(text), chunk_size)
+    result = {}
+    for key in reader.iter_object():
+        if key == "stats":
+            result[key] = {name: reader.decode_value() for name in reader.iter_object()}
+        else:
+            result[key] = reader.decode_value()
+    return result
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 64, 1 << 20])
+@pytest.mark.parametrize("indent", [None, 4])
+def test_json_stream_matches_json_load_at_any_chunk_boundary(chunk_size, indent):
+    text = json.dumps(DOCUMENT, indent=indent, ensure_ascii=False)
+    assert read_stream(text, chunk_size) == json.loads(text)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 1 << 20])
+def test_json_stream_decodes_escapes(chunk_size):
+    text = r'{"a\"b": "c\\\"dé😀\n", "e": {}}'
+    assert read_stream(text, chunk_size) == json.loads(text)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1 << 20])
+@pytest.mark.parametrize("cut", [1, 10, 25, -1])
+def test_json_stream_rejects_truncated_input(chunk_size, cut):
+    text = json.dumps(DOCUMENT)
+    with pytest.raises(json.JSONDecodeError):
+        read_stream(text[:cut], chunk_size)
+
+
+class MemoryCache(dict):
+    def get(self, file_path, stat_type):
+        return super().get((file_path, stat_type))
+
+    def put(self, file_path, stat_type, *entry):
+        self[file_path, stat_type] = entry
+
+
+def test_streamed_and_full_json_loading_agree(tmp_path):
+    path = tmp_path / "solver.json"
+    path.write_text(json.dumps(DOCUMENT))
+
+    full = load_json_data_from_file(str(path), ["rtime", "mempeak"], 1000, 0)
+    streamed = load_json_data_from_file(str(path), ["rtime", "mempeak"], 1000, 0, stream=True)
+    for prog in (full, streamed):
+        # insté2 is unsolved and inst3 above the timeout
+        assert prog.get_instance_names().tolist() == ['inst "quoted"\\1']
+        assert prog.get_values().tolist() == [12.5]
+        assert prog.select("mempeak").get_values().tolist() == [1.0]
+
+
+def test_solved_instances_without_the_plotted_statistic_are_left_out(tmp_path):
+    path = tmp_path / "solver.json"
+    path.write_text(json.dumps(DOCUMENT))
+
+    for stream in (False, True):
+        # inst3 is solved but has no mempeak
+        prog = load_json_data_from_file(str(path), ["mempeak", "rtime"], 1000, 0, stream=stream)
+        assert prog.get_instance_names().tolist() == ['inst "quoted"\\1']
+        assert prog.select("rtime").get_values().tolist() == [12.5]
+
+
+def test_programs_count_the_unsolved_instances_of_the_input(tmp_path):
+    path = tmp_path / "solver.json"
+    path.write_text(json.dumps(DOCUMENT))
+
+    for options in ({}, {"stream": True}, {"cache": MemoryCache()}):
+        assert load_json_data_from_file(str(path), "rtime", 1000, 0, **options).attempted == 3
+        prog = load_json_data_from_file(str(path), "rtime", 1000, 0, ids={"insté2\n", "other"}, **options)
+        assert (len(prog), prog.attempted) == (0, 1)
+        # Kept by the derived programs
+        assert prog.select("rtime").attempted == prog.take([]).attempted == 1
+
+
+def program(name, instances):
+    return Program(name, name, instances)
+
+
+def test_join_data_keeps_the_shared_instances_aligned():
+    data = [
+        program("a", {"i1": 1.0, "i2": 2.0, "i3": 3.0, "i4": 4.0}),
+        program("b", {"i4": 40.0, "i2": 20.0, "i5": 50.0, "i1": 10.0}),
+        program("c", {"i2": 200.0, "i1": 100.0, "i4": 400.0}),
+    ]
+    joined = join_data(data)
+
+    # Instances in the order of the first program
+    for prog in joined:
+        assert prog.get_instance_names().tolist() == ["i1", "i2", "i4"]
+    assert [prog.get_values().tolist() for prog in joined] == [
+        [1.0, 2.0, 4.0],
+        [10.0, 20.0, 40.0],
+        [100.0, 200.0, 400.0],
+    ]
+    # The inputs are not modified
+    assert len(data[1]) == 4
+
+
+def test_join_data_without_shared_instances():
+    joined = join_data([program("a", {"i1": 1.0}), program("b", {"i2": 2.0})])
+    assert [len(prog) for prog in joined] == [0, 0]
+
+
+def test_from_arrays_does_not_freeze_the_given_array():
+    values = np.array([2.0, 1.0])
+    prog = Program.from_arrays("a", "a", np.array(["i1", "i2"]), values)
+    assert values.flags.writeable
+    assert not prog.get_values().flags.writeable
+
+
+@pytest.mark.parametrize("delimiter", ["\t", ",", ";"])
+def test_csv_missing_cells_are_unsolved(tmp_path, delimiter):
+    rows = [
+        ["instance", "s1", "s2"],
+        ["i1", "1.5", ""],
+        ["i2", "", "TO"],
+        ["i3", "-", "2"],
+        ["i4", "2000", "3"],
+    ]
+    path = tmp_path / "table.csv"
+    path.write_text("\n".join(delimiter.join(row) for row in rows) + "\n")
+
+    s1, s2 = load_csv_data_from_file(str(path), 1000, 0)
+    assert (s1.get_name(), s2.get_name()) == ("s1", "s2")
+    assert s1.get_instance_names().tolist() == ["i1"]  # i4 is above the timeout
+    assert s2.get_instance_names().tolist() == ["i3", "i4"]
+    assert s2.get_values().tolist() == [2.0, 3.0]
+    assert s1.attempted == s2.attempted == 4
+
+
+def test_whitespace_csv_needs_marked_missing_cells(tmp_path):
+    path = tmp_path / "table.txt"
+    path.write_text("instance s1 s2\ni1 1.5 -\ni2 n/a 2\n")
+    s1, s2 = load_csv_data_from_file(str(path), 1000, 0)
+    assert s1.get_instance_names().tolist() == ["i1"]
+    assert s2.get_instance_names().tolist() == ["i2"]
+
+    path.write_text("instance s1 s2\ni1 1.5\ni2 3 2\n")
+    with pytest.raises(ValueError, match="whitespace separated"):
+        load_csv_data_from_file(str(path), 1000, 0)
+
+
+def test_filtering_keeps_the_cached_status(tmp_path):
+    path = tmp_path / "solver.json"
+    path.write_text(json.dumps(DOCUMENT))
+    cache = MemoryCache()
+    for _ in range(2):
+        # Without a time to bound, the mask starts from the status of the cache entry
+        prog = load_json_data_from_file(str(path), "mempeak", 1000, 0, ids={'inst "quoted"\\1'}, cache=cache)
+        assert prog.get_instance_names().tolist() == ['inst "quoted"\\1']
+    assert cache.get(str(path), "mempeak")[3].tolist() == [True, False, True]
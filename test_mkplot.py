@@ -0,0 +1,10 @@
+from mkplot import get_parser
+
+
+def test_profile_does_not_take_the_inputs():
+    args = vars(get_parser().parse_args(["--profile", "solver1.json", "solver2.json"]))
+    assert args["profile"] and args["profile_out"] == "profile.json"
+    assert args["data"] == ["solver1.json", "solver2.json"]
+
+    args = vars(get_parser().parse_args(["--profile_out", "run.json", "solver1.json"]))
+    assert not args["profile"] and args["profile_out"] == "run.json"
@@ -0,0 +1,74 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import portfolio
+from load_data import Program
+from portfolio import exact_portfolio, greedy_portfolio, portfolio_stage, runtime_matrix
+
+INF = np.inf
+
+# The greedy choice of the largest solver (0) overlaps both complementary ones (1, 2)
+TRAP = np.array(
+    [
+        [INF, 1, 1, 1, 1, INF],
+        [1, 1, 1, INF, INF, INF],
+        [INF, INF, INF, 1, 1, 1],
+    ]
+)
+
+
+def coverage(times, solvers):
+    return int(np.isfinite(times[solvers]).any(axis=0).sum())
+
+
+def test_greedy_picks_the_largest_gain_first():
+    chosen, cover = greedy_portfolio(TRAP, 2)
+    assert chosen[0] == 0
+    assert cover == [4, 5]
+
+
+def test_greedy_breaks_ties_by_the_total_runtime():
+    times = np.array([[5.0, 5.0, INF], [1.0, 1.0, INF], [INF, INF, 3.0]])
+    chosen, cover = greedy_portfolio(times, 3)
+    assert chosen == [1, 2, 0]
+    assert cover == [2, 3, 3]
+
+
+def test_exact_beats_greedy_when_greedy_is_trapped():
+    best, count = exact_portfolio(TRAP, 2)
+    assert sorted(best) == [1, 2]
+    assert count == 6
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 4])
+def test_exact_matches_brute_force(k):
+    rng = np.random.default_rng(k)
+    times = np.where(rng.random((7, 40)) < 0.3, rng.random((7, 40)), INF)
+    best, count = exact_portfolio(times, k)
+    brute = max(coverage(times, list(subset)) for subset in itertools.combinations(range(7), k))
+    assert len(best) == k and count == brute == coverage(times, best)
+
+
+def test_exact_refuses_too_many_subsets(monkeypatch):
+    monkeypatch.setattr(portfolio, "MAX_EXACT_SUBSETS", 10)
+    with pytest.raises(ValueError, match="too large"):
+        exact_portfolio(np.ones((6, 3)), 3)  # 15 subsets of 2 solvers
+
+
+def test_runtime_matrix_aligns_the_programs():
+    a = Program("a", "a", {"i1": 1.0, "i2": 2.0})
+    b = Program("b", "b", {"i3": 3.0, "i1": 4.0})
+    times = runtime_matrix([a, b])
+    assert times.tolist() == [[1.0, 2.0, INF], [4.0, INF, 3.0]]
+
+
+def test_portfolio_stage_returns_the_vbs_of_each_portfolio():
+    progs = [
+        Program(str(i), str(i), {f"i{j}": 1.0 for j in np.flatnonzero(np.isfinite(row))})
+        for i, row in enumerate(TRAP)
+    ]
+    greedy1, greedy2, exact = portfolio_stage(progs, 2, exact=True)
+    assert [prog.get_name() for prog in (greedy1, greedy2, exact)] == ["greedy-1", "greedy-2", "exact-2"]
+    assert [len(prog) for prog in (greedy1, greedy2, exact)] == [4, 5, 6]
@@ -0,0 +1,59 @@
+import os
+
+import matplotlib
+import numpy as np
+import pytest
+
+matplotlib.use("pdf")
+
+from matplotlib.collections import QuadMesh  # noqa: E402
+
+from load_data import Program  # noqa: E402
+from mkplot import get_parser  # noqa: E402
+from scatter import Scatter  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def plotter(*options):
+    args = ["-p", "scatter", "-t", "1000", "--def_path", os.path.join(HERE, "defaults.json")]
+    return Scatter(vars(get_parser().parse_args([*args, "--density", *options, "in.json"])))
+
+
+def test_linear_bins_span_the_axes():
+    # The axes end at the first power of 10 not below the timeout
+    edges = plotter("--density_bins", "10")._bin_edges(False, np.array([1.0, 5.0]))
+    assert edges.tolist() == pytest.approx(np.linspace(0, 1000, 11).tolist())
+
+
+def test_log_bins_start_at_the_smallest_positive_value():
+    scatter = plotter("--density_bins", "4", "--x_log", "--y_log")
+    edges = scatter._bin_edges(True, np.array([0.0, 0.1, 50.0]))
+    assert edges.tolist() == pytest.approx([0.1, 1.0, 10.0, 100.0, 1000.0])
+
+
+def test_density_mesh_counts_every_pair():
+    rng = np.random.default_rng(0)
+    names = np.array([f"i{i}" for i in range(5000)])
+    xs, ys = rng.uniform(1, 999, 5000), rng.uniform(1, 999, 5000)
+    data = [Program.from_arrays("a", "a", names, xs), Program.from_arrays("b", "b", names, ys)]
+
+    scatter = plotter("--density_bins", "20")
+    with scatter.rc_context():
+        _, axes = scatter.figure()
+        scatter.draw(axes[0, 0], data)
+        (mesh,) = [artist for artist in axes[0, 0].collections if isinstance(artist, QuadMesh)]
+
+    counts = mesh.get_array()
+    assert counts.sum() == 5000
+    assert counts.shape == (20, 20)
+    assert scatter.data_artists == []
+
+
+def test_density_without_shared_pairs_draws_no_mesh():
+    data = [Program("a", "a", {"i1": 1.0}), Program("b", "b", {"i2": 2.0})]
+    scatter = plotter()
+    with scatter.rc_context():
+        _, axes = scatter.figure()
+        scatter.draw(axes[0, 0], data)
+        assert not any(isinstance(artist, QuadMesh) for artist in axes[0, 0].collections)
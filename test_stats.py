@@ -0,0 +1,84 @@
+import math
+
+import numpy as np
+import pytest
+
+from load_data import Program
+from stats import compute_stats, format_text
+from vbs import compute_vbs
+
+
+def program(name, instances, attempted=None):
+    names, values = np.array(list(instances), dtype=str), np.array(list(instances.values()), dtype=float)
+    return Program.from_arrays(name, name, names, values, attempted=attempted)
+
+
+@pytest.fixture
+def data():
+    return [
+        program("a", {"i1": 1.0, "i2": 4.0, "i3": 6.0}),
+        program("b", {"i1": 2.0, "i2": 3.0, "i4": 5.0}),
+        program("c", {"i2": 8.0}),
+    ]
+
+
+def by_alias(stats):
+    return {entry["alias"]: entry for entry in stats["programs"]}
+
+
+def test_par_counts_the_unsolved_instances_at_the_timeout(data):
+    stats = compute_stats(data, 10)
+    assert stats["instances"] == 4
+    programs = by_alias(stats)
+    assert programs["a"]["par2"] == pytest.approx((1 + 4 + 6 + 2 * 10) / 4)
+    assert programs["c"]["par10"] == pytest.approx((8 + 3 * 10 * 10) / 4)
+
+    # The --dataset gives the total number of instances
+    stats = compute_stats(data, 10, nof_instances=5)
+    assert by_alias(stats)["b"]["par2"] == pytest.approx((2 + 3 + 5 + 2 * 2 * 10) / 5)
+
+
+def test_par_without_a_timeout_is_only_defined_without_unsolved_instances():
+    stats = compute_stats([program("a", {"i1": 1.0, "i2": 3.0}), program("b", {"i1": 2.0})], math.inf)
+    programs = by_alias(stats)
+    assert programs["a"]["par2"] == programs["a"]["par10"] == pytest.approx(2.0)
+    assert programs["b"]["par2"] is None
+    assert stats["timeout"] is None
+
+
+def test_par_instances_include_the_attempted_unsolved_ones():
+    data = [program("a", {"i1": 1.0}, attempted=4), program("b", {"i2": 3.0}, attempted=3)]
+    stats = compute_stats(data, 10)
+    assert stats["instances"] == 4
+    assert by_alias(stats)["a"]["par2"] == pytest.approx((1 + 3 * 2 * 10) / 4)
+
+
+def test_unique_solves(data):
+    programs = by_alias(compute_stats(data, 10))
+    assert [programs[alias]["unique"] for alias in "abc"] == [1, 1, 0]
+
+
+def test_pairwise_wins_losses_and_solved_delta(data):
+    pairwise = {(row["alias"], row["other"]): row for row in compute_stats(data, 10)["pairwise"]}
+    assert len(pairwise) == 6
+    # a is faster on i1, b on i2, and each solves one instance the other does not
+    assert (pairwise["a", "b"]["wins"], pairwise["a", "b"]["losses"]) == (2, 2)
+    assert (pairwise["b", "c"]["wins"], pairwise["b", "c"]["losses"]) == (3, 0)
+    assert pairwise["a", "c"]["solved_delta"] == 2
+    assert pairwise["c", "a"]["solved_delta"] == -2
+
+
+def test_derived_programs_do_not_compete(data):
+    data = data + [compute_vbs("vbs", data)]
+    stats = compute_stats(data, 10, competing=[True, True, True, False])
+    programs = by_alias(stats)
+    assert [programs[alias]["unique"] for alias in "abc"] == [1, 1, 0]
+    assert programs["vbs"]["unique"] is None
+    assert programs["vbs"]["solved"] == 4
+    assert all("vbs" not in (row["alias"], row["other"]) for row in stats["pairwise"])
+    assert "# unique: -" in format_text(stats)
+
+
+def test_no_programs():
+    stats = compute_stats([], 10)
+    assert (stats["instances"], stats["programs"], stats["pairwise"]) == (0, [], [])
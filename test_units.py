@@ -0,0 +1,47 @@
+import math
+
+import pytest
+
+from units import is_time_stat, parse_values
+
+
+def test_numbers_are_kept():
+    assert parse_values([1, 2.5, None]).tolist()[:2] == [1.0, 2.5]
+    assert math.isnan(parse_values([1, None])[1])
+
+
+def test_memory_units_are_converted_to_mib():
+    values = parse_values(["214016 KiB", "2 GiB", "1048576 B", "1 MB", 3, " 1.5e3kib "], "mempeak")
+    assert values.tolist() == pytest.approx([209.0, 2048.0, 1.0, 1e6 / 1024**2, 3.0, 1500 / 1024])
+
+
+def test_time_units_are_converted_to_seconds():
+    values = parse_values(["250 ms", "2min", "1 h", "5", None, "3 us"], "rtime")
+    assert values[:4].tolist() == [0.25, 120.0, 3600.0, 5.0]
+    assert math.isnan(values[4])
+    assert values[5] == pytest.approx(3e-6)
+
+
+def test_unit_case_is_ignored():
+    assert parse_values(["1 KIB", "1 kib"]).tolist() == [1 / 1024, 1 / 1024]
+
+
+@pytest.mark.parametrize(
+    "raw, message",
+    [
+        (["1 parsec"], "Unknown units of the mem values: parsec"),
+        (["1 s", "1 KiB"], "The mem values mix memory and time units"),
+        (["1..2 s"], "Cannot parse the mem values"),
+        ([[1], "1 s"], "Non-numeric mem values"),
+    ],
+)
+def test_invalid_values_are_rejected(raw, message):
+    with pytest.raises(ValueError, match=message):
+        parse_values(raw, "mem")
+
+
+@pytest.mark.parametrize(
+    "stat, is_time", [("rtime", True), ("CPUTime", True), (None, True), ("mempeak", False)]
+)
+def test_time_stats_are_told_by_name(stat, is_time):
+    assert is_time_stat(stat) == is_time
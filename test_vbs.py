@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from load_data import Program
+from vbs import add_vbs, compute_vbs
+
+
+def program(name, names, values, columns=None, stat=None):
+    return Program.from_arrays(name, name, np.array(names), np.array(values, dtype=float), columns, stat)
+
+
+@pytest.fixture
+def data():
+    return [
+        program("a", ["i1", "i2", "i3"], [5.0, 1.0, 7.0]),
+        program("b", ["i3", "i4", "i1"], [2.0, 4.0, 5.0]),
+        program("c", ["i2"], [0.5]),
+    ]
+
+
+def vbs_values(prog):
+    return dict(zip(prog.get_instance_names().tolist(), prog.get_values().tolist()))
+
+
+def test_vbs_takes_the_minimum_over_all_solved_instances(data):
+    vbs = compute_vbs("vbs", data)
+    assert vbs.get_name() == vbs.get_alias() == "vbs"
+    assert vbs_values(vbs) == {"i1": 5.0, "i2": 0.5, "i3": 2.0, "i4": 4.0}
+
+
+def test_vbs_of_no_programs_is_empty():
+    assert len(compute_vbs("vbs", [])) == 0
+
+
+def test_vbs_spec_selects_programs_by_name_list_or_all(data):
+    all_vbs, pair, single = add_vbs(data, '{"all": "all", "pair": ["a", "c"], "single": "b"}')[3:]
+    assert vbs_values(all_vbs) == {"i1": 5.0, "i2": 0.5, "i3": 2.0, "i4": 4.0}
+    assert vbs_values(pair) == {"i1": 5.0, "i2": 0.5, "i3": 7.0}
+    assert vbs_values(single) == vbs_values(data[1])
+
+
+@pytest.mark.parametrize("spec", ['{"vbs": ["x"]}', '{"vbs": "x"}'])
+def test_vbs_spec_rejects_unknown_programs(data, spec):
+    with pytest.raises(ValueError, match='Unknown tool "x"'):
+        add_vbs(data, spec)
+
+
+def test_vbs_spec_must_be_a_json_object(data):
+    with pytest.raises(TypeError):
+        add_vbs(data, '["a", "b"]')
+
+
+def test_vbs_columns_come_from_the_best_program():
+    a_time, b_time = np.array([1.0, 9.0]), np.array([3.0, 2.0])
+    a = program("a", ["i1", "i2"], a_time, {"rtime": a_time, "mem": np.array([10.0, 20.0])}, "rtime")
+    b = program("b", ["i2", "i1"], b_time, {"rtime": b_time, "mem": np.array([30.0, 40.0])}, "rtime")
+    vbs = compute_vbs("vbs", [a, b])
+
+    assert vbs.stat == "rtime"
+    names = vbs.get_instance_names().tolist()
+    mem = dict(zip(names, vbs.select("mem").get_values().tolist()))
+    assert mem == {"i1": 10.0, "i2": 30.0}
+
+
+def test_vbs_skips_missing_values():
+    # Programs loaded with a statistic that is not a time may lack it on solved instances
+    a_mem, b_mem = np.array([np.nan, 2.0, np.nan]), np.array([3.0, np.nan])
+    a = program("a", ["i1", "i2", "i3"], a_mem, {"mem": a_mem}, "mem")
+    b = program("b", ["i1", "i2"], b_mem, {"mem": b_mem}, "mem")
+    vbs = compute_vbs("vbs", [a, b])
+    assert vbs_values(vbs) == {"i1": 3.0, "i2": 2.0}
+    assert vbs.select("mem").get_values().tolist() == [3.0, 2.0]
+
+
+def test_vbs_was_run_on_the_instances_of_its_programs():
+    a = Program.from_arrays("a", "a", np.array(["i1"]), np.array([1.0]), attempted=3)
+    b = Program.from_arrays("b", "b", np.array(["i2"]), np.array([2.0]), attempted=5)
+    assert compute_vbs("vbs", [a, b]).attempted == 5
+    assert compute_vbs("vbs", [program("c", ["i1"], [1.0])]).attempted is None
@@ -0,0 +1,76 @@
+import string
+import numpy as np
+
+# Unit (in lower case) -> (dimension, factor to the base unit). Times are converted to
+# seconds and memory sizes to MiB.
+UNITS = {
+    "ns": ("time", 1e-9),
+    "us": ("time", 1e-6),
+    "µs": ("time", 1e-6),
+    "ms": ("time", 1e-3),
+    "s": ("time", 1.0),
+    "sec": ("time", 1.0),
+    "min": ("time", 60.0),
+    "h": ("time", 3600.0),
+    "b": ("memory", 1 / 1024**2),
+    "kb": ("memory", 1e3 / 1024**2),
+    "kib": ("memory", 1 / 1024),
+    "mb": ("memory", 1e6 / 1024**2),
+    "mib": ("memory", 1.0),
+    "gb": ("memory", 1e9 / 1024**2),
+    "gib": ("memory", 1024.0),
+    "tb": ("memory", 1e12 / 1024**2),
+    "tib": ("memory", 1024.0**2),
+}
+
+_NUMBER_CHARS = string.digits + ".+-eE"
+_UNIT_CHARS = string.ascii_letters + "µ" + string.whitespace
+
+
+def is_time_stat(stat) -> bool:
+    """
+    Tells whether the values of a statistic are times, which the timeout applies to, by its name
+    (e.g. rtime or cputime). Programs without a named statistic (csv tables, DB runtimes) hold times.
+    """
+    return stat is None or "time" in stat.lower()
+
+
+def parse_values(raw, name="input") -> np.ndarray:
+    """
+    Converts a column of json values to float64. Numbers are kept as they are, strings such as
+    "214016 KiB" or "250 ms" are converted to MiB or seconds, and missing values become NaN.
+    The strings are split and converted on whole arrays, with one lookup per distinct unit.
+    """
+    try:
+        return np.array(raw, dtype=np.float64)
+    except (TypeError, ValueError):
+        pass  # Strings with units
+
+    is_str = np.fromiter((isinstance(value, str) for value in raw), dtype=bool, count=len(raw))
+    objects = np.array(raw, dtype=object)
+    values = np.empty(len(raw), dtype=np.float64)
+    try:
+        values[~is_str] = np.array(objects[~is_str].tolist(), dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError(f"Non-numeric {name} values")
+
+    strs = np.char.strip(np.array(objects[is_str].tolist(), dtype=str))
+    numbers = np.char.rstrip(strs, _UNIT_CHARS)
+    units = np.char.lower(np.char.strip(np.char.lstrip(strs, _NUMBER_CHARS)))
+    try:
+        numbers = np.where(numbers == "", "nan", numbers).astype(np.float64)
+    except ValueError as e:
+        raise ValueError(f"Cannot parse the {name} values: {e}")
+
+    uniq, inverse = np.unique(units, return_inverse=True)
+    unknown = [unit for unit in uniq.tolist() if unit and unit not in UNITS]
+    if unknown:
+        raise ValueError(f"Unknown units of the {name} values: {', '.join(unknown)}")
+    dims = {UNITS[unit][0] for unit in uniq.tolist() if unit}
+    if len(dims) > 1:
+        raise ValueError(f"The {name} values mix {' and '.join(sorted(dims))} units")
+
+    # Numbers without a unit are taken as given
+    factors = np.array([UNITS[unit][1] if unit else 1.0 for unit in uniq.tolist()])
+    values[is_str] = numbers * factors[inverse]
+    return values
@@ -0,0 +1,88 @@
+from typing import Dict, List, Union
+import json
+import numpy as np
+
+from load_data import Program, instance_ids
+
+
+def parse_vbs_spec(spec: str) -> Dict[str, Union[str, List[str]]]:
+    try:
+        vbs_spec = json.loads(spec)
+    except (TypeError, json.JSONDecodeError):
+        vbs_spec = None
+    if not isinstance(vbs_spec, dict):
+        raise TypeError(
+            'Issue converting vbs spec to json. The format is \'{"vbs1": ["tool1", "tool2"], "vbs2": "all"}\''
+        )
+    return vbs_spec
+
+
+def _select_programs(data: List[Program], tools) -> List[Program]:
+    if tools == "all":
+        return list(data)
+    if isinstance(tools, str):
+        tools = [tools]
+
+    selected = []
+    for tool in tools:
+        # Tools are referred to by alias or name
+        matches = [prog for prog in data if tool in (prog.get_alias(), prog.get_name())]
+        if not matches:
+            raise ValueError(f"Unknown tool \"{tool}\" in vbs spec")
+        selected += matches
+    return selected
+
+
+def shared_instance_index(programs: List[Program]):
+    """
+    Maps the instances of all programs onto one index. Returns the instance names in order
+    of first appearance, the concatenated instance ids and the concatenated values of the programs.
+    """
+    name_ids, prog_ids = instance_ids(programs)
+    inst_names = np.array(list(name_ids), dtype=str)
+    values = np.concatenate([prog.get_values() for prog in programs])
+    return inst_names, np.concatenate(prog_ids), values
+
+
+def compute_vbs(vbs_name: str, programs: List[Program]) -> Program:
+    """
+    Computes the virtual best solver: every instance solved by any of the programs with
+    the minimum value over them. All programs are aligned on a shared instance index and
+    the minimum is taken in one numpy reduction. The statistics loaded for all programs are
+    kept as columns, taken from the program with the minimum value (the first one on ties).
+    The VBS was run on the instances of the program run on the most of them, if known.
+    """
+    if not programs:
+        return Program.from_arrays(vbs_name, vbs_name, np.array([], dtype=str), np.array([]))
+
+    inst_names, inst_ids, values = shared_instance_index(programs)
+    # Missing values (NaN) are not solutions, instances without any value are left out
+    pos = np.flatnonzero(~np.isnan(values))
+    inst_ids, values = inst_ids[pos], values[pos]
+    solved = np.unique(inst_ids)
+
+    best = np.full(len(inst_names), np.inf)
+    np.minimum.at(best, inst_ids, values)
+
+    stat = programs[0].stat if all(prog.stat == programs[0].stat for prog in programs) else None
+    stats = [col for col in programs[0].columns if all(col in prog.columns for prog in programs)]
+    columns = {}
+    if stats:
+        # Position of the best value of every instance in the concatenated values
+        is_best = values == best[inst_ids]
+        winner = np.full(len(inst_names), len(values))
+        np.minimum.at(winner, inst_ids[is_best], np.flatnonzero(is_best))
+        for col in stats:
+            columns[col] = np.concatenate([prog.columns[col] for prog in programs])[pos[winner[solved]]]
+
+    attempted = max((prog.attempted for prog in programs if prog.attempted is not None), default=None)
+    return Program.from_arrays(vbs_name, vbs_name, inst_names[solved], best[solved], columns, stat, attempted)
+
+
+def add_vbs(data: List[Program], spec: str) -> List[Program]:
+    """
+    Returns the programs followed by one VBS program per entry of the spec.
+    """
+    vbs_spec = parse_vbs_spec(spec)
+    vbs_data = [compute_vbs(vbs_name, _select_programs(data, tools)) for vbs_name, tools in vbs_spec.items()]
+    return data + vbs_data
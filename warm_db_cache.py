@@ -0,0 +1,43 @@
+import argparse
+
+from cache import ExperimentCache
+from load_data import load_ids, warm_experiment_cache
+
+
+def get_parser() -> argparse.ArgumentParser:
+
+    parser = argparse.ArgumentParser(
+        description="Pre-fetch DB experiments into the local cache used by mkplot.py --data_type db",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("exp_ids", nargs="+", help="Experiment ids to fetch")
+    parser.add_argument(
+        "--db_data_ltb", action="store_true", help="Specify if the DB experiments are on LTB data"
+    )
+    parser.add_argument('--dataset', default=None,
+                        help="Path to file containing ids (problem names) used to subset the data")
+    parser.add_argument("--refresh", action="store_true", help="Refetch experiments that are already cached")
+    parser.add_argument(
+        "--cache_dir", default=None, help="Directory of the data caches (default: ~/.cache/cactus_plot)"
+    )
+    parser.add_argument("--cache_size", type=float, default=512, help="Size bound of each cache in MB")
+    parser.add_argument(
+        "--db_cache_ttl",
+        type=float,
+        default=24,
+        help="Hours after which cached DB experiments are refetched (0 never expires)",
+    )
+
+    return parser
+
+
+def main():
+    args = vars(get_parser().parse_args())
+
+    ids = load_ids(args["dataset"]) if args["dataset"] is not None else None
+    cache = ExperimentCache(args["cache_dir"], args["cache_size"], args["db_cache_ttl"])
+    warm_experiment_cache(args["exp_ids"], args["db_data_ltb"], ids, cache, refresh=args["refresh"])
+
+
+if __name__ == "__main__":
+    main()
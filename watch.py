@@ -0,0 +1,159 @@
+"""
+Re-plots the figure whenever an input file changes, e.g. while the solvers of a
+running experiment campaign are still writing their result files.
+
+The loaded programs are kept in memory and only the changed inputs are reloaded.
+Plain cactus and scatter figures are also kept, and only the artists of the changed
+programs are updated before the figure is saved again.
+"""
+from typing import Dict, List
+import os
+import time
+
+from load_data import Program, load_data
+
+
+def _file_state(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class InputWatcher:
+    """
+    Detects changed input files by their modification time and size.
+    """
+
+    def __init__(self, paths: List[str]):
+        self.states = {path: _file_state(path) for path in paths}
+
+    def poll(self) -> List[str]:
+        """
+        Returns the paths that changed since the last poll.
+        """
+        changed = []
+        for path, state in self.states.items():
+            new_state = _file_state(path)
+            if new_state != state:
+                self.states[path] = new_state
+                changed.append(path)
+        return changed
+
+    def wait(self, interval=1.0, debounce=2.0) -> List[str]:
+        """
+        Blocks until inputs changed and then stayed unchanged for debounce seconds, so files
+        are not read while they are being written. Returns the changed paths in input order.
+        """
+        changed, last_change = set(), None
+        while True:
+            new_changes = self.poll()
+            now = time.monotonic()
+            if new_changes:
+                changed.update(new_changes)
+                last_change = now
+            elif changed and now - last_change >= debounce:
+                return [path for path in self.states if path in changed]
+            time.sleep(interval)
+
+
+class LivePlot:
+    """
+    Keeps the figure of a cactus or scatter plot between renders, so changed programs only
+    update their own artists.
+    """
+
+    def __init__(self, plotter):
+        self.plotter = plotter
+        self.fig = self.ax = None
+        self.labels = None
+
+    def render(self, data: List[Program], changed=None):
+        """
+        Draws the programs, or only updates the artists of the programs at the changed indices
+        if the figure was drawn before with the same programs.
+        """
+        labels = [prog.get_alias() for prog in data]
+        with self.plotter.rc_context():
+            redraw = self.fig is None or changed is None or labels != self.labels
+            if redraw or not self.plotter.update(self.ax, data, changed):
+                self.fig, axes = self.plotter.figure()
+                self.ax = axes[0, 0]
+                self.plotter.legend(self.ax, *self.plotter.draw(self.ax, data))
+                self.labels = labels
+            self.plotter.save(self.fig)
+
+
+def _live_plot(args):
+    # Programs derived from all inputs (vbs, portfolios), panels and density meshes are redrawn
+    if args["dry_run"] or args["vbs"] or args["portfolio"] or args["panels"] or args["density"]:
+        return None
+
+    from mkplot import get_plotter
+
+    return LivePlot(get_plotter(args))
+
+
+def _program_indices(paths, programs, selected) -> List[int]:
+    # Indices of the programs of the selected paths in the concatenated program list
+    indices, offset = [], 0
+    for path in paths:
+        if path in selected:
+            indices += range(offset, offset + len(programs[path]))
+        offset += len(programs[path])
+    return indices
+
+
+def watch(args):
+    """
+    Plots the inputs and re-plots them on every change until interrupted.
+    """
+    from mkplot import plot_data, print_stats, process_data
+
+    if args["data_type"] not in ("json", "csv"):
+        raise ValueError("Watch mode needs json or csv input files")
+    # Every reload of a file that is still being written would add another cache entry
+    args = dict(args, no_cache=True)
+
+    paths = args["data"]
+    watcher = InputWatcher(paths)  # before loading, so no change is missed
+    programs: Dict[str, List[Program]] = {path: load_data([path], args) for path in paths}
+
+    live = _live_plot(args)
+
+    def render(changed=None):
+        data = [prog for path in paths for prog in programs[path]]
+        if live is not None:
+            live.render(data, changed)
+        elif args["dry_run"]:
+            print_stats(process_data(data, args), args, data)
+        else:
+            plot_data(process_data(data, args), args)
+
+    render()
+    print(f"Watching {len(paths)} inputs, press Ctrl-C to stop")
+    try:
+        while True:
+            changed_paths = watcher.wait(args["watch_interval"], args["watch_debounce"])
+            start = time.perf_counter()
+
+            reloaded, redraw = [], False
+            for path in changed_paths:
+                try:
+                    new_programs = load_data([path], args)
+                except (OSError, ValueError, KeyError) as e:
+                    # Keep the last complete version, the file is reloaded on its next change
+                    # (a json file missing its preamble or a stat key is not fully written yet)
+                    print(f"Could not reload {path}: {e}")
+                    continue
+                redraw |= len(new_programs) != len(programs[path])  # e.g. a csv column was added
+                programs[path] = new_programs
+                reloaded.append(path)
+            if not reloaded:
+                continue
+
+            render(None if redraw else _program_indices(paths, programs, reloaded))
+            print(f"Updated {len(reloaded)} inputs in {time.perf_counter() - start:.2f} s")
+    except KeyboardInterrupt:
+        pass